@@ -0,0 +1,38 @@
+"""
+File-based cache shared by every process on the host.
+
+Django's FileBasedCache already stores entries where all workers and
+management commands can read them, but its add() and incr() are a read
+followed by a write. The response cache relies on both across processes
+(add() for the rebuild lock, incr() for generations and hit counters), so
+here they run under an exclusive lock on one file in the cache directory.
+"""
+import os
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+LOCK_NAME = 'cache.lock'
+
+
+class SharedFileCache(FileBasedCache):
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, LOCK_NAME), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            return super().incr(key, delta, version)
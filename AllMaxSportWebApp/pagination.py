@@ -0,0 +1,131 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination over a unique ordering such as (created_at, id).
+
+    Unlike DRF's CursorPagination, which stores a single field plus an
+    offset, the cursor holds every ordering value of the boundary row so
+    each page is a plain indexed range query, however deep it is.
+    Subclasses set `ordering` and may offer alternatives in
+    `ordering_choices`, selected with ?ordering=.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering_query_param = 'ordering'
+    ordering_choices = {}
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        choice = request.query_params.get(self.ordering_query_param)
+        return self.ordering_choices.get(choice, self.ordering)
+
+    @classmethod
+    def requested(cls, request):
+        """Listings stay plain arrays unless the client asks for a page."""
+        params = request.query_params
+        return cls.cursor_query_param in params or cls.page_size_query_param in params
+
+    def window(self, queryset, request, view=None):
+        """
+        The requested page plus one row telling whether another follows, as
+        a single range query; `queryset` may already be a values_list().
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+        self.cursor = self.decode_cursor(request)
+
+        reverse, position = self.cursor or (False, None)
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(ordering, position))
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        results = list(self.window(queryset, request, view))
+        reverse, position = self.cursor or (False, None)
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Walked backwards past the first row; restart from the top.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(True, self.page[0])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            reverse, position = bool(tokens['r']), tokens['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            # A well-formed cursor may still carry values its fields reject.
+            position = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+            if any(value is None for value in position):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, cursor):
+        reverse, position = cursor
+        payload = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        encoded = b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _link(self, reverse, instance):
+        # Pages may hold model instances or .values() dicts.
+        if isinstance(instance, dict):
+            position = [str(instance[field.lstrip('-')]) for field in self.ordering]
+        else:
+            position = [str(getattr(instance, field.lstrip('-'))) for field in self.ordering]
+        return self.encode_cursor((reverse, position))
+
+    @staticmethod
+    def _keyset_filter(ordering, position):
+        """Row-value comparison `(a, b) > (x, y)` spelled as `a > x OR (a = x AND b > y)`."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
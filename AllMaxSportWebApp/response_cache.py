@@ -0,0 +1,149 @@
+"""
+Shared cache of anonymous GET responses.
+
+Entries are keyed by the view's scope, the normalized query string and the
+current "generation" of every model the response is built from. Signals
+bump a model's generation on each write, which moves readers to fresh keys
+at once; superseded entries simply expire. Only one worker rebuilds a
+missing entry, the others wait briefly for it to appear.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+GENERATION_KEY = 'response_cache:generation:{}'
+STATS_KEY = 'response_cache:stats:{}:{}'
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_generations(names):
+    keys = [GENERATION_KEY.format(name) for name in names]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Seed from the clock so an evicted counter never restarts at a
+            # number that still has stale responses stored under it.
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _bump(name):
+    key = GENERATION_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_generation(*names):
+    """
+    Bump now so this process stops serving old responses, and again once the
+    transaction commits so a response rebuilt from pre-commit rows is dropped.
+    """
+    for name in names:
+        _bump(name)
+        transaction.on_commit(lambda name=name: _bump(name))
+
+
+def record(scope, outcome):
+    key = STATS_KEY.format(scope, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats(scope):
+    hits = cache.get(STATS_KEY.format(scope, 'hit'), 0)
+    misses = cache.get(STATS_KEY.format(scope, 'miss'), 0)
+    return {'hits': hits, 'misses': misses}
+
+
+def response_key(request, scope, generations):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = ':'.join([
+        scope, request.get_host(), request.accepted_renderer.format, params,
+        *(str(generation) for generation in generations),
+    ])
+    return f'response_cache:{scope}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def _store(key, response):
+    if not isinstance(response, Response) or response.status_code != 200:
+        return
+    cache.set(key, {
+        'data': response.data,
+        'etag': response.get('ETag'),
+        'last_modified': response.get('Last-Modified'),
+    }, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def _replay(request, entry):
+    timestamp = parse_http_date_safe(entry['last_modified']) if entry['last_modified'] else None
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=timestamp)
+    if response is None:
+        response = Response(entry['data'])
+    if entry['etag']:
+        response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = entry['last_modified']
+    return response
+
+
+def cache_anonymous_get(scope, *models):
+    """
+    Decorate an APIView.get so anonymous requests are answered from the
+    cache. `models` names the generations the response depends on.
+    """
+    def decorator(view_get):
+        @wraps(view_get)
+        def wrapper(self, request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return view_get(self, request, *args, **kwargs)
+
+            key = response_key(request, scope, get_generations(models))
+            entry = cache.get(key)
+            if entry is None:
+                lock = f'{key}:lock'
+                if cache.add(lock, 1, timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+                    try:
+                        response = view_get(self, request, *args, **kwargs)
+                        _store(key, response)
+                    finally:
+                        cache.delete(lock)
+                    record(scope, 'miss')
+                    response['X-Cache'] = 'MISS'
+                    return response
+                entry = _wait_for(key)
+                if entry is None:
+                    record(scope, 'miss')
+                    response = view_get(self, request, *args, **kwargs)
+                    response['X-Cache'] = 'MISS'
+                    return response
+
+            record(scope, 'hit')
+            response = _replay(request, entry)
+            response['X-Cache'] = 'HIT'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,161 @@
+"""
+Full-text search indexes kept next to the model tables.
+
+On SQLite each index is an FTS5 virtual table whose rowid is the model's
+primary key. On PostgreSQL it is a plain table holding a weighted tsvector
+per row behind a GIN index. The tables themselves are created by each app's
+migrations; other backends report `supported = False` and callers fall back
+to their old icontains filters.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Private-use characters mark matches inside snippets until the text has been
+# HTML-escaped; they are then replaced by <mark> tags.
+MATCH_START, MATCH_END = '\ue000', '\ue001'
+
+
+class SearchIndex:
+    def __init__(self, table, columns, pk_column='object_id', config='simple'):
+        # columns: ((name, bm25 weight, tsvector weight letter), ...)
+        self.table = table
+        self.columns = columns
+        self.pk_column = pk_column
+        self.config = config
+
+    @property
+    def supported(self):
+        return connection.vendor in ('sqlite', 'postgresql')
+
+    @staticmethod
+    def tokens(query):
+        return TOKEN_RE.findall(query.lower())
+
+    def replace(self, rows):
+        """Insert or overwrite documents; `rows` yields (pk, [column values])."""
+        rows = [(pk, ['' if value is None else str(value) for value in values]) for pk, values in rows]
+        if not rows or not self.supported:
+            return
+        names = [name for name, _, _ in self.columns]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                self.delete([pk for pk, _ in rows], cursor=cursor)
+                cursor.executemany(
+                    f"INSERT INTO {self.table} (rowid, {', '.join(names)}) "
+                    f"VALUES (%s, {', '.join(['%s'] * len(names))})",
+                    [[pk, *values] for pk, values in rows],
+                )
+            else:
+                document = ' || '.join(
+                    f"setweight(to_tsvector('{self.config}', %s), '{letter}')"
+                    for _, _, letter in self.columns
+                )
+                cursor.executemany(
+                    f"INSERT INTO {self.table} ({self.pk_column}, document) VALUES (%s, {document}) "
+                    f"ON CONFLICT ({self.pk_column}) DO UPDATE SET document = EXCLUDED.document",
+                    [[pk, *values] for pk, values in rows],
+                )
+
+    def delete(self, pks, cursor=None):
+        pks = list(pks)
+        if not pks or not self.supported:
+            return
+        key = 'rowid' if connection.vendor == 'sqlite' else self.pk_column
+        sql = f"DELETE FROM {self.table} WHERE {key} IN ({', '.join(['%s'] * len(pks))})"
+        if cursor is not None:
+            cursor.execute(sql, pks)
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(sql, pks)
+
+    def delete_all(self):
+        if not self.supported:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def rebuild(self, queryset, write, chunk_size=500):
+        """
+        Empty the index and re-index every row of `queryset`, one chunk of
+        primary keys at a time; `write(chunk)` writes the documents of a
+        queryset. Returns the number of rows indexed.
+        """
+        self.delete_all()
+        last_pk = 0
+        total = 0
+        while True:
+            pks = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return total
+            write(queryset.filter(pk__in=pks))
+            last_pk = pks[-1]
+            total += len(pks)
+
+    def search(self, query, limit):
+        """
+        Return primary keys matching every word of `query` (prefix match),
+        best match first. Returns None when the backend has no index.
+        """
+        if not self.supported:
+            return None
+        tokens = self.tokens(query)
+        if not tokens:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(*self._search_sql(tokens, limit))
+            return [row[0] for row in cursor.fetchall()]
+
+    def _search_sql(self, tokens, limit):
+        if connection.vendor == 'sqlite':
+            weights = ', '.join(str(weight) for _, weight, _ in self.columns)
+            match = ' '.join(f'"{token}"*' for token in tokens)
+            return (
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, {weights}) LIMIT %s",
+                [match, limit],
+            )
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        return (
+            f"SELECT {self.pk_column} FROM {self.table}, to_tsquery('{self.config}', %s) query "
+            f"WHERE document @@ query ORDER BY ts_rank(document, query) DESC LIMIT %s",
+            [tsquery, limit],
+        )
+
+    def snippets(self, query, column, pks, source=None, tokens=12):
+        """
+        Return {pk: HTML snippet of `column` with the matched words in <mark>}
+        for the given primary keys. SQLite cuts the snippet from the index;
+        PostgreSQL stores no text, so `source(pks)` must return {pk: text}.
+        """
+        words = self.tokens(query)
+        pks = list(pks)
+        if not words or not pks or not self.supported:
+            return {}
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                names = [name for name, _, _ in self.columns]
+                cursor.execute(
+                    f"SELECT rowid, snippet({self.table}, {names.index(column)}, %s, %s, '…', %s) "
+                    f"FROM {self.table} WHERE {self.table} MATCH %s "
+                    f"AND rowid IN ({', '.join(['%s'] * len(pks))})",
+                    [MATCH_START, MATCH_END, tokens, ' '.join(f'"{word}"*' for word in words), *pks],
+                )
+            else:
+                texts = source(pks)
+                cursor.execute(
+                    f"SELECT d.id, ts_headline('{self.config}', d.body, to_tsquery('{self.config}', %s), %s) "
+                    f"FROM unnest(%s::bigint[], %s::text[]) AS d(id, body)",
+                    [
+                        ' & '.join(f'{word}:*' for word in words),
+                        f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords={tokens}, MinWords={tokens // 2}',
+                        list(texts), list(texts.values()),
+                    ],
+                )
+            return {
+                pk: escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+                for pk, snippet in cursor.fetchall()
+            }
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -102,6 +103,37 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Every worker and management command must see the same response cache
+# generations, hit counters and rebuild locks, so the cache lives on disk.
+CACHES = {
+    'default': {
+        'BACKEND': 'AllMaxSportWebApp.file_cache.SharedFileCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'allmaxsport_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Rendered category trees are keyed by a version bumped on every Category
+# change, so this only bounds how long superseded versions linger.
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds each process may serve its in-memory copy of the active discount
+# codes before reloading them (writes in the same process apply at once).
+DISCOUNT_CODE_CACHE_TTL = 60
+
+# Anonymous GET responses of the catalog and blog views. Entries are keyed by
+# per-model generations bumped on every write, so the timeout only bounds how
+# long superseded entries linger. A worker rebuilding an entry holds a lock
+# for at most RESPONSE_CACHE_LOCK_TIMEOUT seconds; others wait up to
+# RESPONSE_CACHE_LOCK_WAIT seconds for it before building their own copy.
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_LOCK_WAIT = 2
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -153,6 +185,38 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = 'Media/'
 MEDIA_ROOT = BASE_DIR / 'Media'
 
+# Uploaded images are stored as these variants (bounding box, never
+# upscaled), each encoded as WebP and JPEG without metadata. Encoding runs on
+# IMAGE_PROCESSING_WORKERS background threads per process.
+IMAGE_VARIANTS = {
+    'thumbnail': (150, 150),
+    'card': (480, 480),
+    'full': (1600, 1600),
+}
+IMAGE_QUALITY = 82
+IMAGE_PROCESSING_WORKERS = 2
+# Threads per process that read, hash and check the files of an upload batch.
+IMAGE_UPLOAD_WORKERS = 4
+
+# Limits for image uploads. A multipart POST may carry at most
+# IMAGE_UPLOAD_MAX_FILES files of IMAGE_UPLOAD_MAX_FILE_SIZE bytes each;
+# larger files go through the chunked upload API, which streams every chunk
+# (at most IMAGE_UPLOAD_MAX_CHUNK_SIZE bytes) to IMAGE_UPLOAD_TEMP_DIR in
+# IMAGE_UPLOAD_READ_SIZE blocks. A user may have IMAGE_UPLOAD_MAX_SESSIONS
+# unfinished chunked uploads; purge_upload_sessions drops abandoned ones.
+IMAGE_UPLOAD_MAX_FILES = 20
+IMAGE_UPLOAD_MAX_FILE_SIZE = 25 * 1024 * 1024
+IMAGE_UPLOAD_MAX_CHUNK_SIZE = 4 * 1024 * 1024
+IMAGE_UPLOAD_READ_SIZE = 64 * 1024
+IMAGE_UPLOAD_MAX_SESSIONS = 20
+IMAGE_UPLOAD_SESSION_TTL_HOURS = 24
+IMAGE_UPLOAD_TEMP_DIR = BASE_DIR / 'upload_tmp'
+DATA_UPLOAD_MAX_NUMBER_FILES = IMAGE_UPLOAD_MAX_FILES
+
+# Host names whose links count as internal in the blog SEO analysis, besides
+# relative links.
+SEO_INTERNAL_HOSTS = []
+
 AUTH_USER_MODEL = 'UserModule.User'
 
 
@@ -0,0 +1,198 @@
+"""
+Precomputed "related items" lists.
+
+Each item is described by a few feature channels (the words of its text,
+its tags, its category, the orders it was bought in...). Every channel is a
+sparse vector of unit length, and `combine` scales them so that the dot
+product of two items is the weighted sum of their per-channel cosines, a
+score between 0 and 1.
+
+`SimilarityIndex` scores one item against all others through an inverted
+index (feature -> items carrying it), so only items that share a feature
+are touched. With NumPy installed a row is accumulated with one bincount
+over the posting arrays; otherwise a dict does the same work.
+
+`sync_related` keeps a lookup table of the top matches up to date
+incrementally: only items whose inputs changed (by fingerprint), or whose
+stored list refers to one that did, are rescored. Scores between two
+unchanged items are kept as stored even though the IDF weights drift as
+the corpus grows; a full rebuild recomputes everything.
+"""
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional speedup
+    numpy = None
+
+WORD_RE = re.compile(r'\w\w+', re.UNICODE)
+SCORE_DIGITS = 6
+
+
+def tokens(text):
+    return WORD_RE.findall((text or '').lower())
+
+
+def fingerprint(*parts):
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def unit(weights):
+    norm = math.sqrt(sum(value * value for value in weights.values()))
+    return {feature: value / norm for feature, value in weights.items()} if norm else {}
+
+
+def flags(features):
+    """Unit vector for a set of categorical features (tags, a category...)."""
+    return unit({feature: 1.0 for feature in features if feature is not None})
+
+
+def tfidf(documents):
+    """
+    {id: unit TF-IDF vector} for {id: list of words}, with sublinear term
+    frequency. Words found in every document get no weight at all.
+    """
+    counts = {key: Counter(words) for key, words in documents.items()}
+    frequency = Counter(word for words in counts.values() for word in words)
+    total = len(counts)
+    idf = {word: math.log((1 + total) / (1 + found)) for word, found in frequency.items()}
+    return {
+        key: unit({word: (1 + math.log(count)) * idf[word] for word, count in words.items() if idf[word] > 0})
+        for key, words in counts.items()
+    }
+
+
+def combine(channels, weights):
+    """
+    One vector from {channel: unit vector}; channels are scaled by the square
+    root of their share of `weights`, so dot products sum weighted cosines.
+    """
+    total = sum(weights.values())
+    vector = {}
+    for channel, values in channels.items():
+        scale = math.sqrt(weights[channel] / total)
+        for feature, value in values.items():
+            vector[(channel, feature)] = scale * value
+    return vector
+
+
+def top(scores, limit):
+    """The `limit` best [id, score] pairs, ties broken by id."""
+    best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+    return [[key, round(score, SCORE_DIGITS)] for key, score in best]
+
+
+class SimilarityIndex:
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.ids = list(vectors)
+        postings = defaultdict(lambda: ([], []))
+        for position, key in enumerate(self.ids):
+            for feature, value in vectors[key].items():
+                postings[feature][0].append(position)
+                postings[feature][1].append(value)
+        if numpy is not None:
+            postings = {
+                feature: (numpy.array(positions, dtype=numpy.intp), numpy.array(values))
+                for feature, (positions, values) in postings.items()
+            }
+        self.postings = dict(postings)
+
+    def scores(self, key, min_score):
+        """{other id: score} for every other item scoring at least `min_score`."""
+        parts = [
+            (self.postings[feature], weight)
+            for feature, weight in self.vectors.get(key, {}).items() if feature in self.postings
+        ]
+        if numpy is not None:
+            if not parts:
+                return {}
+            totals = numpy.bincount(
+                numpy.concatenate([positions for (positions, _), _ in parts]),
+                weights=numpy.concatenate([values * weight for (_, values), weight in parts]),
+                minlength=len(self.ids),
+            )
+            found = {self.ids[position]: float(totals[position]) for position in numpy.flatnonzero(totals >= min_score)}
+        else:
+            totals = defaultdict(float)
+            for (positions, values), weight in parts:
+                for position, value in zip(positions, values):
+                    totals[position] += value * weight
+            found = {self.ids[position]: score for position, score in totals.items() if score >= min_score}
+        found.pop(key, None)
+        return found
+
+
+def refresh(vectors, fingerprints, stored, limit, min_score, full=False):
+    """
+    Work out which related lists must be rewritten.
+
+    `stored` maps every item built before to (fingerprint, [[id, score], ...]).
+    Returns ({id: new list} for the items to write, ids that no longer exist).
+    """
+    removed = set(stored) - set(vectors)
+    changed = {key for key in vectors if full or key not in stored or stored[key][0] != fingerprints[key]}
+    if not changed and not removed:
+        return {}, removed
+
+    index = SimilarityIndex(vectors)
+    rows = {key: index.scores(key, min_score) for key in changed}
+    result = {key: top(row, limit) for key, row in rows.items()}
+
+    # Scores are symmetric, so the changed rows hold every other item's
+    # score against the changed items.
+    incoming = defaultdict(dict)
+    for key, row in rows.items():
+        for other, score in row.items():
+            if other not in changed:
+                incoming[other][key] = score
+
+    stale = changed | removed
+    for key, (_, related) in stored.items():
+        if key in stale:
+            continue
+        if any(other in stale for other, _ in related):
+            # A listed item changed or is gone, so the next best is unknown.
+            new = top(index.scores(key, min_score), limit)
+        elif key in incoming:
+            new = top({**dict(related), **incoming[key]}, limit)
+        else:
+            continue
+        if new != related:
+            result[key] = new
+    return result, removed
+
+
+def sync_related(model, vectors, fingerprints, limit, min_score, full=False):
+    """
+    Bring `model` (pk, fingerprint, related) up to date with `vectors`.
+    Returns (lists written, lists deleted).
+    """
+    stored = {pk: (stored_fingerprint, related) for pk, stored_fingerprint, related in
+              model.objects.values_list('pk', 'fingerprint', 'related')}
+    result, removed = refresh(vectors, fingerprints, stored, limit, min_score, full=full)
+    pk_name = model._meta.pk.attname
+    rows = [
+        model(**{pk_name: key}, fingerprint=fingerprints[key], related=related)
+        for key, related in result.items()
+    ]
+    with transaction.atomic():
+        model.objects.filter(pk__in=removed).delete()
+        model.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True,
+            unique_fields=[model._meta.pk.name], update_fields=['fingerprint', 'related', 'built_at'],
+        )
+    return len(rows), len(removed)
+
+
+def related_ids(model, key):
+    """The stored related ids for `key`, best first ([] when none were built)."""
+    related = model.objects.filter(pk=key).values_list('related', flat=True).first()
+    return [other for other, _ in related or []]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Blog, Tag, SEOStatus
+from .models import Category, Blog, Tag, SEOStatus, RelatedBlogList
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -17,6 +17,7 @@ class SEOStatusInline(admin.StackedInline):
     model = SEOStatus
     can_delete = False
     extra = 0
+    readonly_fields = [field.name for field in SEOStatus._meta.fields]
 
 @admin.register(Blog)
 class BlogAdmin(admin.ModelAdmin):
@@ -29,7 +30,7 @@ class BlogAdmin(admin.ModelAdmin):
     ordering = ('-created_date',)
     filter_horizontal = ('tags',)
     inlines = [SEOStatusInline]
-    readonly_fields = ('created_date', 'modify_date')
+    readonly_fields = ('created_date', 'modify_date', 'seo_score', 'seo_score_color')
 
 @admin.register(SEOStatus)
 class SEOStatusAdmin(admin.ModelAdmin):
@@ -44,3 +45,8 @@ class SEOStatusAdmin(admin.ModelAdmin):
         'headings_status', 'images_status', 'internal_links_status'
     )
     search_fields = ('blog__title',)
+
+@admin.register(RelatedBlogList)
+class RelatedBlogListAdmin(admin.ModelAdmin):
+    list_display = ('blog_id', 'built_at')
+    readonly_fields = ('blog', 'fingerprint', 'related', 'built_at')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from AllMaxSportWebApp.response_cache import bump_generation
+from BlogModule.related import build_related
+
+
+class Command(BaseCommand):
+    help = "Refresh the precomputed related-posts lists of posts whose content, tags or category changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rescore every post instead of only the changed ones.")
+
+    def handle(self, *args, **options):
+        written, deleted = build_related(full=options['full'])
+        if written or deleted:
+            bump_generation('blog')
+        self.stdout.write(self.style.SUCCESS(f"Updated {written} and removed {deleted} related-post list(s)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from AllMaxSportWebApp.response_cache import bump_generation
+from BlogModule.models import Blog
+from BlogModule.search import blog_index, index_blogs
+
+
+class Command(BaseCommand):
+    help = "Rebuild the blog full-text search index from the Blog table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not blog_index.supported:
+            raise CommandError("The configured database backend has no blog search index.")
+        with transaction.atomic():
+            total = blog_index.rebuild(Blog.objects.all(), index_blogs, chunk_size=options['chunk_size'])
+            bump_generation('blog')
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} blog posts."))
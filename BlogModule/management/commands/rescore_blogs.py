@@ -0,0 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from BlogModule.models import Blog
+from BlogModule.seo import SOURCE_FIELDS, analyze, content_hash, save_analysis
+
+
+class Command(BaseCommand):
+    help = "Recompute the SEO analysis of every blog post whose content changed, across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true', help="Re-analyze posts whose stored hash still matches.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        rows = Blog.objects.order_by('id').values('id', 'seo_status__content_hash', *SOURCE_FIELDS)
+        # Only the pure analysis runs in the workers; results are written here.
+        analyze_post = partial(analyze, internal_hosts=settings.SEO_INTERNAL_HOSTS)
+        rescored, last_id, pool = 0, 0, None
+        try:
+            # One chunk of posts is held at a time, however large the corpus.
+            while True:
+                chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+                if not chunk:
+                    break
+                last_id = chunk[-1]['id']
+                stale = [
+                    row for row in chunk
+                    if options['force'] or row['seo_status__content_hash'] != content_hash(row)
+                ]
+                if not stale:
+                    continue
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=options['workers'])
+                sources = ({name: row[name] for name in SOURCE_FIELDS} for row in stale)
+                results = pool.map(analyze_post, sources, chunksize=max(1, chunk_size // 10))
+                with transaction.atomic():
+                    for row, result in zip(stale, results):
+                        save_analysis(row['id'], result)
+                rescored += len(stale)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if not rescored:
+            self.stdout.write(self.style.SUCCESS("All blog posts are up to date."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Rescored {rescored} blog post(s)."))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogModule', '0007_remove_blog_images_alter_blog_featured_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['status', 'seo_score'], name='blog_status_seo_score_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogModule', '0008_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seostatus',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+
+# Post bodies are indexed as HTML here; saving a post (or running
+# rebuild_blog_search) rewrites its document as plain text.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE blog_search USING fts5(
+        title, keywords, excerpt, content,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO blog_search (rowid, title, keywords, excerpt, content)
+    SELECT id, title, keywords, COALESCE(excerpt, ''), content FROM "BlogModule_blog"
+    """,
+]
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE blog_search (
+        blog_id bigint PRIMARY KEY,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX blog_search_document_idx ON blog_search USING GIN (document)",
+    """
+    INSERT INTO blog_search (blog_id, document)
+    SELECT id,
+        setweight(to_tsvector('simple', title), 'A')
+        || setweight(to_tsvector('simple', keywords), 'B')
+        || setweight(to_tsvector('simple', COALESCE(excerpt, '')), 'C')
+        || setweight(to_tsvector('simple', content), 'D')
+    FROM "BlogModule_blog"
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRES_CREATE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS blog_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogModule', '0009_seostatus_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogModule', '0010_blog_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['created_date', 'id'], name='blog_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['modify_date', 'id'], name='blog_modified_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogModule', '0011_blog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBlogList',
+            fields=[
+                ('blog', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='BlogModule.blog')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('related', models.JSONField(default=list, help_text='[[blog id, score], ...]')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 12:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('BlogModule', '0012_related_lists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seostatus',
+            name='analyzed_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
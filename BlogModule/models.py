@@ -30,6 +30,13 @@ class Blog(models.Model):
     seo_score_color = models.CharField(max_length=20, default='text-gray-500')
     featured_image = models.CharField(max_length=1000, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'seo_score'], name='blog_status_seo_score_idx'),
+            models.Index(fields=['created_date', 'id'], name='blog_created_id_idx'),
+            models.Index(fields=['modify_date', 'id'], name='blog_modified_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -71,5 +78,24 @@ class SEOStatus(models.Model):
     internal_links_status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     internal_links_message = models.TextField()
 
+    # Hash of the analyzed title/content/meta/keywords (see BlogModule.seo).
+    content_hash = models.CharField(max_length=64, blank=True)
+    # Rescoring leaves Blog.modify_date alone; list validators read this too.
+    analyzed_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return f"SEO Status for {self.blog.title}"
+
+
+class RelatedBlogList(models.Model):
+    """Precomputed related posts of a post, best first; built by BlogModule.related."""
+    # No constraint: a deleted post's list stays until the next build removes it.
+    blog = models.OneToOneField(
+        Blog, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name='+'
+    )
+    fingerprint = models.CharField(max_length=64)
+    related = models.JSONField(default=list, help_text="[[blog id, score], ...]")
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Related posts of blog {self.blog_id}"
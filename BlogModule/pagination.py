@@ -0,0 +1,20 @@
+from rest_framework.pagination import PageNumberPagination
+
+from AllMaxSportWebApp.pagination import KeysetPagination
+
+
+class BlogSearchPagination(PageNumberPagination):
+    """Pages over the ranked id list of a search, so rank order is kept."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class BlogCursorPagination(KeysetPagination):
+    ordering_choices = {
+        'created_date': ('created_date', 'id'),
+        '-created_date': ('-created_date', '-id'),
+        'modify_date': ('modify_date', 'id'),
+        '-modify_date': ('-modify_date', '-id'),
+    }
+    ordering = ordering_choices['-created_date']
@@ -0,0 +1,48 @@
+"""
+Related posts: published posts scored by TF-IDF cosine over their text,
+shared tags and a shared category (see AllMaxSportWebApp.similarity).
+"""
+from collections import defaultdict
+
+from AllMaxSportWebApp.similarity import combine, fingerprint, flags, related_ids, sync_related, tfidf, tokens
+from .models import Blog, RelatedBlogList
+from .search import plain_text
+
+WEIGHTS = {'text': 0.6, 'tags': 0.25, 'category': 0.15}
+RELATED_LIMIT = 6
+MIN_SCORE = 0.05
+
+
+def blog_features():
+    """({blog id: vector}, {blog id: fingerprint}) for every published post."""
+    posts = Blog.objects.filter(status='published').order_by('id')
+    tags = defaultdict(list)
+    for blog_id, tag_id in (
+        Blog.tags.through.objects.filter(blog__status='published').order_by('tag_id').values_list('blog_id', 'tag_id')
+    ):
+        tags[blog_id].append(tag_id)
+
+    rows = list(posts.values_list('id', 'title', 'excerpt', 'content', 'category_id'))
+    text = tfidf({
+        blog_id: tokens(' '.join([title, excerpt or '', plain_text(content)]))
+        for blog_id, title, excerpt, content, _ in rows
+    })
+    vectors, fingerprints = {}, {}
+    for blog_id, title, excerpt, content, category_id in rows:
+        vectors[blog_id] = combine({
+            'text': text[blog_id],
+            'tags': flags(tags[blog_id]),
+            'category': flags([category_id]),
+        }, WEIGHTS)
+        fingerprints[blog_id] = fingerprint(title, excerpt, content, tags[blog_id], category_id)
+    return vectors, fingerprints
+
+
+def build_related(full=False):
+    """Refresh RelatedBlogList; returns (lists written, lists deleted)."""
+    vectors, fingerprints = blog_features()
+    return sync_related(RelatedBlogList, vectors, fingerprints, RELATED_LIMIT, MIN_SCORE, full=full)
+
+
+def related_blog_ids(blog_id):
+    return related_ids(RelatedBlogList, blog_id)
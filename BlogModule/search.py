@@ -0,0 +1,61 @@
+from html import unescape
+
+from django.utils.html import strip_tags
+
+from AllMaxSportWebApp.search import SearchIndex
+from .models import Blog
+
+SEARCH_MAX_RESULTS = 500
+
+INDEXED_FIELDS = ('id', 'title', 'keywords', 'excerpt', 'content')
+
+blog_index = SearchIndex(
+    'blog_search',
+    (
+        ('title', 10.0, 'A'),
+        ('keywords', 5.0, 'B'),
+        ('excerpt', 3.0, 'C'),
+        ('content', 1.0, 'D'),
+    ),
+    pk_column='blog_id',
+)
+
+
+def plain_text(html):
+    """Post bodies are HTML; index and highlight only the readable text."""
+    return unescape(strip_tags(html or ''))
+
+
+def document(title, keywords, excerpt, content):
+    return [title, keywords, excerpt, plain_text(content)]
+
+
+def index_blogs(blogs):
+    """Write the search documents for a Blog queryset."""
+    rows = blogs.order_by().values_list(*INDEXED_FIELDS)
+    blog_index.replace((row[0], document(*row[1:])) for row in rows)
+
+
+def index_blog(blog):
+    blog_index.replace([(blog.id, document(blog.title, blog.keywords, blog.excerpt, blog.content))])
+
+
+def remove_blogs(blog_ids):
+    blog_index.delete(blog_ids)
+
+
+def search_blog_ids(query):
+    """Ranked blog ids for `query`, or None when the backend has no index."""
+    return blog_index.search(query, SEARCH_MAX_RESULTS)
+
+
+def content_texts(blog_ids):
+    return {
+        blog_id: plain_text(content)
+        for blog_id, content in Blog.objects.filter(id__in=blog_ids).values_list('id', 'content')
+    }
+
+
+def blog_snippets(query, blog_ids):
+    """{blog id: highlighted content snippet} for a page of search hits."""
+    return blog_index.snippets(query, 'content', blog_ids, source=content_texts)
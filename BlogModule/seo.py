@@ -0,0 +1,194 @@
+"""
+Server-side SEO analysis of blog posts.
+
+`analyze` is a pure function of the post's title, content (HTML), meta
+description and keywords; it returns the SEOStatus fields together with the
+overall score and its colour. Results are stored with a hash of those inputs,
+so a post whose content did not change is never analyzed twice.
+"""
+import hashlib
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from .models import Blog, SEOStatus
+
+# Bump when the rules change so every stored result is recomputed.
+ANALYZER_VERSION = 1
+
+SOURCE_FIELDS = ('title', 'content', 'meta_description', 'keywords')
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+POINTS = {'ok': 1.0, 'warning': 0.5, 'error': 0.0}
+SCORE_COLORS = ((80, 'text-green-500'), (50, 'text-yellow-500'), (0, 'text-red-500'))
+
+
+class ContentParser(HTMLParser):
+    """Collects visible text, headings, images and links from post HTML."""
+
+    def __init__(self):
+        super().__init__()
+        self.text = []
+        self.headings = []
+        self.images = []
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+            self.headings.append(tag)
+        elif tag == 'img':
+            self.images.append((attrs.get('alt') or '').strip())
+        elif tag == 'a' and attrs.get('href'):
+            self.links.append(attrs['href'])
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+
+def content_hash(values):
+    """Hash of the analyzed inputs; `values` maps SOURCE_FIELDS to their values."""
+    raw = '\x1f'.join([str(ANALYZER_VERSION), *((values.get(name) or '') for name in SOURCE_FIELDS)])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def is_internal(href, internal_hosts):
+    parts = urlsplit(href)
+    if parts.scheme in ('mailto', 'tel', 'javascript'):
+        return False
+    return not parts.netloc or parts.netloc.lower() in internal_hosts
+
+
+def check_title(title):
+    length = len(title.strip())
+    if 50 <= length <= 60:
+        return 'ok', f"Title length is {length} characters."
+    if 30 <= length <= 70:
+        return 'warning', f"Title length is {length} characters; aim for 50-60."
+    return 'error', f"Title length is {length} characters; aim for 50-60."
+
+
+def check_content_length(words):
+    count = len(words)
+    if count >= 300:
+        return 'ok', f"Content has {count} words."
+    if count >= 150:
+        return 'warning', f"Content has {count} words; aim for at least 300."
+    return 'error', f"Content has only {count} words; aim for at least 300."
+
+
+def check_keyword_density(words, keywords):
+    keyword = next((item.strip().lower() for item in keywords.split(',') if item.strip()), '')
+    if not keyword:
+        return 'warning', "No focus keyword set."
+    if not words:
+        return 'error', f'Focus keyword "{keyword}" does not appear in the content.'
+    keyword_words = WORD_RE.findall(keyword)
+    size = len(keyword_words)
+    hits = sum(1 for index in range(len(words) - size + 1) if words[index:index + size] == keyword_words)
+    density = hits * size * 100 / len(words)
+    if hits == 0:
+        return 'error', f'Focus keyword "{keyword}" does not appear in the content.'
+    if 0.5 <= density <= 2.5:
+        return 'ok', f'Keyword density of "{keyword}" is {density:.1f}%.'
+    return 'warning', f'Keyword density of "{keyword}" is {density:.1f}%; aim for 0.5-2.5%.'
+
+
+def check_meta_description(meta_description):
+    length = len(meta_description.strip())
+    if not length:
+        return 'error', "Meta description is missing."
+    if 120 <= length <= 160:
+        return 'ok', f"Meta description is {length} characters."
+    return 'warning', f"Meta description is {length} characters; aim for 120-160."
+
+
+def check_headings(headings):
+    h1_count = headings.count('h1')
+    if h1_count > 1:
+        return 'error', f"Content has {h1_count} H1 headings; the title should be the only one."
+    if 'h2' not in headings:
+        return 'warning', "Content has no H2 subheadings."
+    return 'ok', f"Content has {len(headings)} headings."
+
+
+def check_images(images):
+    if not images:
+        return 'warning', "Content has no images."
+    missing = sum(1 for alt in images if not alt)
+    if not missing:
+        return 'ok', f"All {len(images)} images have alt text."
+    if missing < len(images):
+        return 'warning', f"{missing} of {len(images)} images have no alt text."
+    return 'error', "No image has alt text."
+
+
+def check_internal_links(links, internal_hosts):
+    count = sum(1 for href in links if is_internal(href, internal_hosts))
+    if count >= 2:
+        return 'ok', f"Content has {count} internal links."
+    if count == 1:
+        return 'warning', "Content has 1 internal link; add at least one more."
+    return 'error', "Content has no internal links."
+
+
+def analyze(values, internal_hosts=()):
+    """
+    Return {SEOStatus field: value, ..., 'seo_score', 'seo_score_color',
+    'content_hash'} for `values` (a mapping of SOURCE_FIELDS).
+    """
+    parser = ContentParser()
+    parser.feed(values.get('content') or '')
+    parser.close()
+    words = WORD_RE.findall(' '.join(parser.text).lower())
+    internal_hosts = {host.lower() for host in internal_hosts}
+
+    checks = {
+        'title_length': check_title(values.get('title') or ''),
+        'content_length': check_content_length(words),
+        'keyword_density': check_keyword_density(words, values.get('keywords') or ''),
+        'meta_description': check_meta_description(values.get('meta_description') or ''),
+        'headings': check_headings(parser.headings),
+        'images': check_images(parser.images),
+        'internal_links': check_internal_links(parser.links, internal_hosts),
+    }
+    result = {}
+    for name, (check_status, message) in checks.items():
+        result[f'{name}_status'] = check_status
+        result[f'{name}_message'] = message
+
+    score = round(100 * sum(POINTS[check_status] for check_status, _ in checks.values()) / len(checks))
+    result['seo_score'] = score
+    result['seo_score_color'] = next(color for threshold, color in SCORE_COLORS if score >= threshold)
+    result['content_hash'] = content_hash(values)
+    return result
+
+
+def save_analysis(blog_id, result, created=False):
+    """Store an `analyze` result on the post and its SEOStatus."""
+    fields = dict(result)
+    score, color = fields.pop('seo_score'), fields.pop('seo_score_color')
+    if created:
+        SEOStatus.objects.create(blog_id=blog_id, **fields)
+    else:
+        SEOStatus.objects.update_or_create(blog_id=blog_id, defaults=fields)
+    # A queryset update, so saving the score does not re-enter post_save.
+    Blog.objects.filter(id=blog_id).update(seo_score=score, seo_score_color=color)
+
+
+def refresh_seo(blog, created=False, force=False):
+    """
+    Analyze `blog` unless its stored result matches the current content.
+    `created` means the post has no SEOStatus yet.
+    """
+    values = {name: getattr(blog, name) for name in SOURCE_FIELDS}
+    if not (created or force):
+        stored = SEOStatus.objects.filter(blog_id=blog.id).values_list('content_hash', flat=True).first()
+        if stored == content_hash(values):
+            return False
+    result = analyze(values, settings.SEO_INTERNAL_HOSTS)
+    save_analysis(blog.id, result, created=created)
+    blog.seo_score, blog.seo_score_color = result['seo_score'], result['seo_score_color']
+    return True
@@ -1,6 +1,28 @@
+from django.db import transaction
 from rest_framework import serializers
+from AllMaxSportWebApp.response_cache import bump_generation
 from .models import Blog, Tag, SEOStatus, Category
 
+
+def resolve_tags(tags_data):
+    """
+    Return the Tag rows for the posted tag names, creating missing ones, in a
+    constant number of queries however many tags there are.
+    """
+    names = list(dict.fromkeys(item['name'] for item in tags_data))
+    if not names:
+        return []
+    tags = list(Tag.objects.filter(name__in=names))
+    if len(tags) < len(names):
+        existing = {tag.name for tag in tags}
+        # ignore_conflicts: a concurrent request may create the same names.
+        Tag.objects.bulk_create([Tag(name=name) for name in names if name not in existing], ignore_conflicts=True)
+        tags = list(Tag.objects.filter(name__in=names))
+        # bulk_create sends no post_save, so bump the tag list cache here.
+        bump_generation('tag')
+    return tags
+
+
 class TagSerializer(serializers.ModelSerializer):
     name = serializers.CharField(validators=[])
 
@@ -33,7 +55,8 @@ class SEOStatusSerializer(serializers.ModelSerializer):
 
 class BlogSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
-    seo_status = SEOStatusSerializer(required=False)
+    # Computed on save by BlogModule.seo.
+    seo_status = SEOStatusSerializer(read_only=True)
     category = CategorySerializer(required=False)
 
     class Meta:
@@ -44,10 +67,11 @@ class BlogSerializer(serializers.ModelSerializer):
             'featured_image', 'modify_date', 'seo_score',
             'seo_score_color', 'seo_status', 'category'
         ]
+        read_only_fields = ['seo_score', 'seo_score_color']
 
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
-        seo_data = validated_data.pop('seo_status', None)
         category_data = validated_data.pop('category', None)
 
         if category_data:
@@ -56,18 +80,14 @@ class BlogSerializer(serializers.ModelSerializer):
 
         blog = Blog.objects.create(**validated_data)
 
-        for tag_item in tags_data:
-            tag, _ = Tag.objects.get_or_create(name=tag_item['name'])
-            blog.tags.add(tag)
-
-        if seo_data:
-            SEOStatus.objects.create(blog=blog, **seo_data)
+        if tags_data:
+            blog.tags.add(*resolve_tags(tags_data))
 
         return blog
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags', [])
-        seo_data = validated_data.pop('seo_status', None)
         category_data = validated_data.pop('category', None)
 
         for attr, value in validated_data.items():
@@ -80,17 +100,31 @@ class BlogSerializer(serializers.ModelSerializer):
         instance.save()
 
         if tags_data:
-            instance.tags.clear()
-            for tag_item in tags_data:
-                tag, _ = Tag.objects.get_or_create(name=tag_item['name'])
-                instance.tags.add(tag)
-
-        if seo_data and hasattr(instance, 'seo_status'):
-            seo = instance.seo_status
-            for attr, value in seo_data.items():
-                setattr(seo, attr, value)
-            seo.save()
-        elif seo_data:
-            SEOStatus.objects.create(blog=instance, **seo_data)
+            instance.tags.set(resolve_tags(tags_data))
 
         return instance
+
+
+class BlogSummarySerializer(serializers.ModelSerializer):
+    """A post without its body or SEO details, for list pages."""
+    tags = TagSerializer(many=True, read_only=True)
+    category = CategorySerializer(read_only=True)
+
+    class Meta:
+        model = Blog
+        fields = [
+            'id', 'title', 'author', 'excerpt', 'status', 'tags',
+            'featured_image', 'modify_date', 'seo_score',
+            'seo_score_color', 'category'
+        ]
+
+
+class BlogHitSerializer(BlogSummarySerializer):
+    """A search hit: the post summary plus a highlighted content snippet."""
+    snippet = serializers.SerializerMethodField()
+
+    class Meta(BlogSummarySerializer.Meta):
+        fields = BlogSummarySerializer.Meta.fields + ['snippet']
+
+    def get_snippet(self, obj):
+        return self.context.get('snippets', {}).get(obj.id, '')
@@ -0,0 +1,42 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from AllMaxSportWebApp.response_cache import bump_generation
+
+from .models import Blog, Category, SEOStatus, Tag
+from .search import index_blog, remove_blogs
+from .seo import refresh_seo
+
+
+# Categories and SEO statuses are nested in every blog response.
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SEOStatus)
+@receiver(post_delete, sender=SEOStatus)
+@receiver(m2m_changed, sender=Blog.tags.through)
+def blog_changed(sender, **kwargs):
+    bump_generation('blog')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    bump_generation('tag')
+
+
+@receiver(post_save, sender=Blog)
+def analyze_seo(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        refresh_seo(instance, created=created)
+
+
+@receiver(post_save, sender=Blog)
+def index_saved_blog(sender, instance, **kwargs):
+    index_blog(instance)
+
+
+@receiver(post_delete, sender=Blog)
+def unindex_deleted_blog(sender, instance, **kwargs):
+    remove_blogs([instance.pk])
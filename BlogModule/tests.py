@@ -1,9 +1,20 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Blog, Tag, Category, SEOStatus
+from .models import Blog, Tag, Category, SEOStatus, RelatedBlogList
+from . import seo
+from AllMaxSportWebApp import similarity
 from .serializers import BlogSerializer, TagSerializer, CategorySerializer
+from .search import blog_index
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -25,23 +36,8 @@ class BlogModelTest(TestCase):
             seo_score_color="text-gray-500",
         )
         self.blog.tags.set([self.tag1, self.tag2])
-        self.seo_status = SEOStatus.objects.create(
-            blog=self.blog,
-            title_length_status="ok",
-            title_length_message="Good title",
-            content_length_status="ok",
-            content_length_message="Content ok",
-            keyword_density_status="ok",
-            keyword_density_message="Density ok",
-            meta_description_status="ok",
-            meta_description_message="Meta ok",
-            headings_status="ok",
-            headings_message="Headings ok",
-            images_status="ok",
-            images_message="Images ok",
-            internal_links_status="ok",
-            internal_links_message="Links ok",
-        )
+        # Computed by the SEO analyzer when the post is saved.
+        self.seo_status = self.blog.seo_status
 
     def test_blog_creation(self):
         self.assertEqual(self.blog.title, "Test Blog")
@@ -143,3 +139,319 @@ class BlogAPITest(TestCase):
         response = self.client.post(reverse("blog-api") + "?tag=true", {"tag_name": "NewTag"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(Tag.objects.filter(name="NewTag").exists())
+
+    def test_fast_list_matches_serializer(self):
+        self.blog.category = self.category
+        self.blog.save()
+        self.blog.tags.add(self.tag)
+        Blog.objects.create(title="No category", content="Plain")
+        slow = self.client.get(reverse("blog-api")).json()
+        with self.assertNumQueries(3):
+            fast = self.client.get(reverse("blog-api") + "?fast=true").json()
+        self.assertEqual(slow, fast)
+
+        url = reverse("blog-api") + f"?id={self.blog.id}"
+        self.assertEqual(self.client.get(url).json(), self.client.get(url + "&fast=true").json())
+
+    def test_list_returns_summaries_and_id_returns_full_post(self):
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as captured:
+            listed = self.client.get(reverse("blog-api")).json()[0]
+        self.assertNotIn("content", listed)
+        self.assertNotIn("seo_status", listed)
+        self.assertEqual(listed["title"], self.blog.title)
+        self.assertNotIn('"content"', captured[1]["sql"])
+        self.assertNotIn("seostatus", captured[1]["sql"].lower())
+
+        full = self.client.get(reverse("blog-api") + f"?id={self.blog.id}").json()[0]
+        self.assertEqual(full["content"], self.blog.content)
+        self.assertIn("seo_status", full)
+
+    def test_list_paging(self):
+        for index in range(4):
+            Blog.objects.create(title=f"Post {index}", content="Body")
+        response = self.client.get(reverse("blog-api") + "?page_size=2").json()
+        self.assertEqual([post["title"] for post in response["results"]], ["Post 3", "Post 2"])
+        seen = [post["id"] for post in response["results"]]
+        while response["next"]:
+            response = self.client.get(response["next"]).json()
+            seen += [post["id"] for post in response["results"]]
+        self.assertEqual(seen, list(Blog.objects.order_by("-created_date", "-id").values_list("id", flat=True)))
+
+        fast = self.client.get(reverse("blog-api") + "?page_size=2&fast=true").json()
+        self.assertEqual([post["title"] for post in fast["results"]], ["Post 3", "Post 2"])
+        self.assertIsNotNone(fast["next"])
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse("blog-api"))
+        etag = response["ETag"]
+        self.assertNotIn("Last-Modified", response)
+        response = self.client.get(reverse("blog-api"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Blog.objects.create(title="Another", content="More")
+        response = self.client.get(reverse("blog-api"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cached_list_follows_tag_and_blog_changes(self):
+        self.blog.tags.add(self.tag)
+        self.assertEqual(self.client.get(reverse("blog-api"))["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(reverse("blog-api"))["X-Cache"], "HIT")
+
+        self.tag.name = "Renamed"
+        self.tag.save()
+        self.assertEqual(self.client.get(reverse("blog-api") + "?tags=true").json()[-1]["name"], "Renamed")
+
+        self.blog.tags.clear()
+        self.assertEqual(self.client.get(reverse("blog-api")).json()[0]["tags"], [])
+
+
+class BlogTagQueryTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username="editor", password="pw", is_staff=True))
+        Tag.objects.create(name="tag-0")
+
+    @staticmethod
+    def tag_queries(captured):
+        return [query["sql"] for query in captured if '"BlogModule_tag"' in query["sql"] or '"BlogModule_blog_tags"' in query["sql"]]
+
+    def create_with_tags(self, count):
+        data = {"title": "Tagged", "content": "Body", "tags": [{"name": f"tag-{index}"} for index in range(count)]}
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse("blog-api"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"], captured
+
+    def test_tag_queries_do_not_grow_with_tag_count(self):
+        _, few = self.create_with_tags(3)
+        blog_id, many = self.create_with_tags(15)
+        self.assertEqual(len(few), len(many))
+        # name__in lookup, bulk insert, re-select, then tags.add(): read + insert.
+        self.assertEqual(len(self.tag_queries(many)), 5)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Blog.objects.get(id=blog_id).tags.count(), 15)
+
+    def test_update_replaces_tags_in_bulk(self):
+        blog_id, _ = self.create_with_tags(5)
+        data = {"tags": [{"name": "tag-4"}, {"name": "fresh"}, {"name": "fresh"}]}
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch(reverse("blog-api") + f"?id={blog_id}", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # As above via tags.set(), which also reads and deletes the removed rows.
+        self.assertEqual(len(self.tag_queries(captured)), 7)
+        self.assertEqual(
+            sorted(Blog.objects.get(id=blog_id).tags.values_list("name", flat=True)), ["fresh", "tag-4"]
+        )
+
+
+class SEOAnalysisTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username="writer", password="pw", is_staff=True))
+        body = " ".join(
+            ["Consistent training and sleep drive steady progress for every lifter."] * 36
+            + ["Protein timing matters."] * 2
+        )
+        self.content = (
+            f"<h2>Why protein</h2><p>{body}</p><img src='/Media/a.jpg' alt='Shaker'>"
+            "<a href='/products/whey'>Whey</a><a href='/blog/recovery'>Recovery</a>"
+        )
+
+    def test_analyzer_checks(self):
+        result = seo.analyze({
+            "title": "Protein timing: what matters for strength and recovery",
+            "content": self.content,
+            "meta_description": "x" * 140,
+            "keywords": "protein, recovery",
+        })
+        self.assertEqual(result["title_length_status"], "ok")
+        self.assertEqual(result["content_length_status"], "ok")
+        self.assertEqual(result["keyword_density_status"], "ok")
+        self.assertEqual(result["internal_links_status"], "ok")
+        self.assertEqual(result["images_status"], "ok")
+        self.assertEqual(result["seo_score"], 100)
+        self.assertEqual(result["seo_score_color"], "text-green-500")
+
+        result = seo.analyze({"title": "Hi", "content": "<h1>a</h1><h1>b</h1><img src='x.jpg'>", "keywords": ""})
+        self.assertEqual(result["headings_status"], "error")
+        self.assertEqual(result["images_status"], "error")
+        self.assertEqual(result["meta_description_status"], "error")
+        self.assertEqual(result["seo_score_color"], "text-red-500")
+
+    def test_client_scores_are_ignored_and_results_stored(self):
+        data = {
+            "title": "Protein timing", "content": self.content, "keywords": "protein",
+            "seo_score": 99, "seo_score_color": "text-green-500",
+        }
+        response = self.client.post(reverse("blog-api"), data, format="json")
+        blog = Blog.objects.get(id=response.data["id"])
+        self.assertNotEqual(blog.seo_score, 99)
+        self.assertEqual(blog.seo_status.headings_status, "ok")
+        self.assertEqual(len(blog.seo_status.content_hash), 64)
+
+    def test_unchanged_content_is_not_reanalyzed(self):
+        blog = Blog.objects.create(title="Recovery", content=self.content, keywords="recovery")
+        with mock.patch.object(seo, "analyze", wraps=seo.analyze) as analyze:
+            blog.status = "published"
+            blog.save()
+            analyze.assert_not_called()
+            blog.title = "Recovery after training: a practical guide for lifters"
+            blog.save()
+            analyze.assert_called_once()
+        blog.refresh_from_db()
+        self.assertEqual(blog.seo_status.title_length_status, "ok")
+
+    def test_rescoring_changes_list_validators(self):
+        blog = Blog.objects.create(title="Post", content=self.content)
+        response = self.client.get(reverse("blog-api"))
+        etag = response["ETag"]
+        SEOStatus.objects.filter(blog=blog).update(content_hash="")
+        later = timezone.now() + timedelta(seconds=5)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            call_command("rescore_blogs", "--workers", "1", stdout=StringIO())
+        response = self.client.get(reverse("blog-api"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rescore_command(self):
+        blogs = [Blog.objects.create(title=f"Post {index}", content=self.content) for index in range(3)]
+        SEOStatus.objects.filter(blog=blogs[0]).update(content_hash="", title_length_status="ok")
+        out = StringIO()
+        call_command("rescore_blogs", "--workers", "2", stdout=out)
+        self.assertIn("Rescored 1 blog post(s).", out.getvalue())
+        self.assertEqual(SEOStatus.objects.get(blog=blogs[0]).title_length_status, "error")
+
+        out = StringIO()
+        call_command("rescore_blogs", stdout=out)
+        self.assertIn("All blog posts are up to date.", out.getvalue())
+
+        # Posts are read and scored a chunk at a time.
+        out = StringIO()
+        with CaptureQueriesContext(connection) as captured:
+            call_command("rescore_blogs", "--workers", "1", "--force", "--chunk-size", "2", stdout=out)
+        self.assertIn("Rescored 3 blog post(s).", out.getvalue())
+        reads = [query["sql"] for query in captured if '"content"' in query["sql"]]
+        self.assertEqual(len(reads), 3)
+        self.assertTrue(all("LIMIT 2" in sql for sql in reads))
+
+
+class BlogSearchTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.creatine = Blog.objects.create(
+            title="Creatine explained", status="published", keywords="supplements",
+            content="<p>Creatine monohydrate is the most studied supplement for <b>strength</b> athletes.</p>"
+        )
+        self.sleep = Blog.objects.create(
+            title="Sleep and recovery", status="published", excerpt="Why rest days matter",
+            content="<p>Recovery needs sleep. Some lifters pair it with creatine &amp; protein.</p>"
+        )
+        for index in range(3):
+            Blog.objects.create(title=f"Draft creatine notes {index}", content="creatine draft", status="draft")
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("blog-api"), {"q": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_ranked_hits_with_snippets(self):
+        data = self.search("creatine", status="published")
+        self.assertEqual(data["count"], 2)
+        titles = [hit["title"] for hit in data["results"]]
+        self.assertEqual(titles, ["Creatine explained", "Sleep and recovery"])
+        self.assertNotIn("content", data["results"][0])
+        self.assertIn("<mark>Creatine</mark> monohydrate", data["results"][0]["snippet"])
+        # Indexed as text: markup is stripped and entities are escaped again.
+        self.assertIn("<mark>creatine</mark> &amp; protein", data["results"][1]["snippet"])
+
+    def test_searches_excerpt_and_keywords_with_pagination(self):
+        self.assertEqual([hit["title"] for hit in self.search("rest days")["results"]], ["Sleep and recovery"])
+        self.assertEqual([hit["title"] for hit in self.search("supplem")["results"]], ["Creatine explained"])
+
+        data = self.search("creatine", page_size=2)
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIsNotNone(data["next"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.sleep.content = "Nothing about supplements here."
+        self.sleep.save()
+        self.assertEqual(self.search("creatine", status="published")["count"], 1)
+        self.creatine.delete()
+        self.assertEqual(self.search("creatine", status="published")["count"], 0)
+
+    def test_snippet_html_is_escaped(self):
+        Blog.objects.create(title="Escaping", content="<p>&lt;script&gt;alert(1)&lt;/script&gt; whey</p>")
+        snippet = self.search("whey")["results"][0]["snippet"]
+        self.assertNotIn("<script>", snippet)
+        self.assertIn("&lt;script&gt;", snippet)
+
+    def test_rebuild_command_indexes_in_chunks(self):
+        blog_index.delete_all()
+        self.assertEqual(self.search("creatine")["count"], 0)
+        out = StringIO()
+        call_command("rebuild_blog_search", "--chunk-size", "2", stdout=out)
+        self.assertIn("Indexed 5 blog posts.", out.getvalue())
+        self.assertEqual(self.search("creatine")["count"], 5)
+
+
+class RelatedBlogsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        nutrition = Tag.objects.create(name="Nutrition")
+        training = Category.objects.create(name="Training")
+        self.protein = self.make("Protein timing", "<p>When to drink protein after a workout.</p>", tags=[nutrition])
+        self.shakes = self.make("Shakes compared", "<p>Whey protein shakes for every workout.</p>", tags=[nutrition])
+        self.squat = self.make("Squat technique", "<p>Keep the bar over the feet.</p>", category=training)
+        self.deadlift = self.make("Deadlift technique", "<p>Pull the bar close to the shins.</p>", category=training)
+        self.draft = self.make("Protein draft", "<p>Protein protein workout.</p>", status="draft", tags=[nutrition])
+
+    def make(self, title, content, status="published", tags=(), category=None):
+        blog = Blog.objects.create(title=title, content=content, status=status, category=category)
+        blog.tags.add(*tags)
+        return blog
+
+    def related(self, blog):
+        return [post["id"] for post in self.client.get(reverse("blog-api"), {"related": blog.id}).json()]
+
+    def test_related_posts(self):
+        call_command("build_related_blogs", stdout=StringIO())
+        self.assertEqual(self.related(self.protein), [self.shakes.id])
+        self.assertEqual(self.related(self.squat), [self.deadlift.id])
+        self.assertEqual(self.related(self.draft), [])
+        self.assertNotIn("content", self.client.get(reverse("blog-api"), {"related": self.squat.id}).json()[0])
+
+    def test_only_changed_posts_are_rescored(self):
+        call_command("build_related_blogs", stdout=StringIO())
+        before = RelatedBlogList.objects.get(blog=self.squat).related[0][1]
+        self.deadlift.title = "Squat and deadlift technique"
+        self.deadlift.save()
+        out = StringIO()
+        call_command("build_related_blogs", stdout=out)
+        # The edited post, plus the one list whose score for it went up.
+        self.assertIn("Updated 2 and removed 0", out.getvalue())
+        self.assertGreater(RelatedBlogList.objects.get(blog=self.squat).related[0][1], before)
+
+        self.deadlift.delete()
+        call_command("build_related_blogs", stdout=out)
+        self.assertIn("removed 1", out.getvalue())
+        self.assertEqual(self.related(self.squat), [])
+
+    def test_numpy_and_pure_python_scoring_agree(self):
+        self.assertIsNotNone(similarity.numpy)
+        call_command("build_related_blogs", stdout=StringIO())
+        vectorized = dict(RelatedBlogList.objects.values_list("blog_id", "related"))
+        with mock.patch.object(similarity, "numpy", None):
+            call_command("build_related_blogs", "--full", stdout=StringIO())
+        self.assertEqual(dict(RelatedBlogList.objects.values_list("blog_id", "related")), vectorized)
+
+    def test_text_weights(self):
+        vectors = similarity.tfidf({1: ["protein", "whey"], 2: ["protein", "squat"], 3: ["protein", "squat"]})
+        self.assertNotIn("protein", vectors[1])
+        self.assertAlmostEqual(sum(value * value for value in vectors[1].values()), 1.0)
+        self.assertEqual(similarity.top({2: 0.5, 3: 0.5, 4: 0.9}, 2), [[4, 0.9], [2, 0.5]])
@@ -1,18 +1,91 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Blog, Tag, Category
-from .serializers import BlogSerializer, TagSerializer, CategorySerializer
+from collections import defaultdict
+from django.db.models import Q, Case, When, Value
+from django.db.models.functions import Coalesce, Greatest
+from .models import Blog, Tag, Category, SEOStatus
+from .serializers import BlogSerializer, BlogSummarySerializer, BlogHitSerializer, TagSerializer, CategorySerializer, SEOStatusSerializer
+from .pagination import BlogCursorPagination, BlogSearchPagination
+from .search import blog_snippets, search_blog_ids
+from .related import related_blog_ids
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
+from AllMaxSportWebApp.renderers import FastJSONRenderer
+from AllMaxSportWebApp.response_cache import cache_anonymous_get
+from AllMaxSportWebApp.conditional import conditional_response, page_validators, queryset_validators
 from UserModule.permissions import IsStaffUser
 
+BLOG_COLUMNS = (
+    'id', 'title', 'author', 'content', 'excerpt', 'meta_description', 'keywords', 'status',
+    'featured_image', 'modify_date', 'seo_score', 'seo_score_color',
+)
+
+
+# A rescore (rescore_blogs) changes seo_score without touching modify_date.
+LAST_CHANGE = Greatest('modify_date', Coalesce('seo_status__analyzed_at', 'modify_date'))
+
+
+# Always loaded so keyset pagination can build cursors from values() rows.
+KEYSET_COLUMNS = ('id', 'created_date', 'modify_date')
+
+
+def blog_values(blogs, fields):
+    """The fast path: plain rows holding only the columns `fields` need."""
+    columns = {name for name in BLOG_COLUMNS if name in fields} | set(KEYSET_COLUMNS)
+    return blogs.values(*columns, 'category_id', 'category__name')
+
+
+def blog_rows(rows, fields):
+    """
+    Serializer-shaped dicts for `fields` built from blog_values() rows: one
+    query for their tags and, for full posts, one for their SEO status, with
+    no model instances or serializer fields involved.
+    """
+    rows = list(rows)
+    ids = [row['id'] for row in rows]
+
+    tags = defaultdict(list)
+    if 'tags' in fields:
+        for blog_id, tag_id, tag_name in (
+            Blog.tags.through.objects.filter(blog_id__in=ids).values_list('blog_id', 'tag_id', 'tag__name')
+        ):
+            tags[blog_id].append({'id': tag_id, 'name': tag_name})
+    seo = {}
+    if 'seo_status' in fields:
+        seo = {
+            row.pop('blog_id'): row
+            for row in SEOStatus.objects.filter(blog_id__in=ids).values('blog_id', *SEOStatusSerializer.Meta.fields)
+        }
+
+    data = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            if name == 'tags':
+                item['tags'] = tags.get(row['id'], [])
+            elif name == 'seo_status':
+                item['seo_status'] = seo.get(row['id'])
+            elif name == 'category':
+                item['category'] = (
+                    {'id': row['category_id'], 'name': row['category__name']}
+                    if row['category_id'] is not None else None
+                )
+            else:
+                item[name] = row[name]
+        data.append(item)
+    return data
+
+
 class BlogAPIView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
         return [IsStaffUser()]
 
+    @cache_anonymous_get('blogs', 'blog', 'tag')
     def get(self, request):
         if request.GET.get('tags') == 'true':
             tags = Tag.objects.all()
@@ -31,13 +104,82 @@ class BlogAPIView(APIView):
         if 'seo_score_color' in request.GET:
             filters['seo_score_color'] = request.GET.get('seo_score_color')
 
-        blogs = Blog.objects.filter(**filters).prefetch_related('tags').select_related('seo_status', 'category')
+        related_ids = None
+        if 'related' in request.GET:
+            try:
+                related_ids = related_blog_ids(int(request.GET['related']))
+            except ValueError:
+                related_ids = []
+            filters['id__in'] = related_ids
+
+        blogs = Blog.objects.filter(**filters)
 
         if 'tags' in request.GET and request.GET.get('tags') != 'true':
             blogs = blogs.filter(tags__name__icontains=request.GET.get('tags'))
-
-        serializer = BlogSerializer(blogs, many=True)
-        return Response(serializer.data)
+        if related_ids:
+            blogs = blogs.order_by(Case(*[When(id=pk, then=Value(rank)) for rank, pk in enumerate(related_ids)]))
+
+        # The related list itself changes only when it is rebuilt. Keyset
+        # pages validate their own rows so deep pages stay a range query.
+        if not request.GET.get('q') and BlogCursorPagination.requested(request):
+            validators = page_validators(request, BlogCursorPagination(), blogs, LAST_CHANGE, related_ids)
+        else:
+            validators = queryset_validators(request, blogs, LAST_CHANGE, related_ids)
+        return conditional_response(request, validators, lambda: self.list_blogs(request, blogs))
+
+    def list_blogs(self, request, blogs):
+        if request.GET.get('q'):
+            return self.search_blogs(request, blogs, request.GET['q'])
+
+        # Lists are summaries; the body and SEO details come with ?id= only.
+        serializer_class = BlogSerializer if 'id' in request.GET else BlogSummarySerializer
+        fields = serializer_class.Meta.fields
+
+        if request.GET.get('fast') == 'true':
+            blogs = blog_values(blogs, fields)
+
+            def render(rows):
+                return blog_rows(rows, fields)
+        else:
+            blogs = blogs.select_related('category').prefetch_related('tags')
+            if serializer_class is BlogSerializer:
+                blogs = blogs.select_related('seo_status')
+            else:
+                blogs = blogs.defer('content', 'meta_description', 'keywords')
+
+            def render(rows):
+                return serializer_class(rows, many=True).data
+
+        if BlogCursorPagination.requested(request):
+            paginator = BlogCursorPagination()
+            page = paginator.paginate_queryset(blogs, request, view=self)
+            return paginator.get_paginated_response(render(page))
+
+        return Response(render(blogs))
+
+    def search_blogs(self, request, blogs, query):
+        ranked_ids = search_blog_ids(query)
+        if ranked_ids is None:
+            ranked_ids = list(
+                blogs.filter(Q(title__icontains=query) | Q(content__icontains=query))
+                .order_by('-modify_date').values_list('id', flat=True).distinct()
+            )
+        else:
+            # Keep the rank order, restricted to the other filters.
+            allowed = set(blogs.filter(id__in=ranked_ids).values_list('id', flat=True))
+            ranked_ids = [blog_id for blog_id in ranked_ids if blog_id in allowed]
+
+        paginator = BlogSearchPagination()
+        page_ids = paginator.paginate_queryset(ranked_ids, request, view=self)
+        posts = (
+            Blog.objects.filter(id__in=page_ids).select_related('category').prefetch_related('tags')
+            .defer('content', 'meta_description', 'keywords').in_bulk()
+        )
+        serializer = BlogHitSerializer(
+            [posts[blog_id] for blog_id in page_ids if blog_id in posts], many=True,
+            context={'snippets': blog_snippets(query, page_ids)}
+        )
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         if request.GET.get('tag') == 'true':
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import UploadSession
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'received', 'size', 'updated_at')
+    search_fields = ('filename', 'user__username')
+    ordering = ('-updated_at',)
@@ -0,0 +1,114 @@
+"""
+Garbage collection of stored images.
+
+A stored file is live when some model still points at it: Product.images,
+the product Category.image JSON, Blog.featured_image (and image URLs
+embedded in Blog.content), a ticket Message.file_url attachment, or
+User.profile_image. A reference to one variant
+of a content-addressed image keeps every variant in that directory.
+"""
+import posixpath
+import re
+from datetime import timedelta
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from BlogModule.models import Blog
+from ProductModule.models import Category, Product
+from TicketModul.models import Message
+
+UPLOAD_ROOT = 'images'
+MEDIA_PATH_RE = re.compile(re.escape(settings.MEDIA_URL.strip('/')) + r'/([^\s"\'<>)?#]+)')
+
+
+def strings(value):
+    """Yield every string inside a JSON value."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from strings(item)
+
+
+def media_paths(text):
+    # URLs from build_absolute_uri percent-encode non-ASCII names; storage
+    # names do not.
+    return [unquote(path) for path in MEDIA_PATH_RE.findall(text)]
+
+
+def storage_paths(value):
+    """Storage names referenced by a URL, a bare storage name or free text."""
+    for text in strings(value):
+        found = media_paths(text)
+        if found:
+            yield from found
+        elif text and '://' not in text and not text.startswith('/'):
+            yield text
+
+
+def referenced_paths():
+    references = set()
+    for images in Product.objects.values_list('images', flat=True).iterator():
+        references.update(storage_paths(images))
+    for image in Category.objects.exclude(image=None).values_list('image', flat=True).iterator():
+        references.update(storage_paths(image))
+    for featured_image, content in Blog.objects.values_list('featured_image', 'content').iterator():
+        references.update(storage_paths(featured_image))
+        references.update(media_paths(content or ''))
+    attachments = Message.objects.exclude(file_url=None).exclude(file_url='')
+    for file_url in attachments.values_list('file_url', flat=True).iterator():
+        references.update(storage_paths(file_url))
+    profile_images = get_user_model().objects.exclude(profile_image='').exclude(profile_image=None)
+    references.update(profile_images.values_list('profile_image', flat=True).iterator())
+    return references
+
+
+def walk(root):
+    try:
+        directories, files = default_storage.listdir(root)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(root, name)
+    for name in directories:
+        yield from walk(posixpath.join(root, name))
+
+
+def upload_roots():
+    return (UPLOAD_ROOT, get_user_model()._meta.get_field('profile_image').upload_to)
+
+
+def unreferenced_files(grace_period):
+    """
+    Stored files nobody references, skipping those written within
+    `grace_period` (an upload not yet attached to a product, post or user).
+    """
+    references = referenced_paths()
+    live_directories = {
+        posixpath.dirname(path) for path in references
+        if posixpath.dirname(path) not in ('', *upload_roots())
+    }
+    cutoff = timezone.now() - grace_period
+    for root in upload_roots():
+        for path in walk(root):
+            if path in references or posixpath.dirname(path) in live_directories:
+                continue
+            if default_storage.get_modified_time(path) > cutoff:
+                continue
+            yield path
+
+
+def collect(grace_period=timedelta(hours=24), dry_run=False):
+    removed = []
+    for path in unreferenced_files(grace_period):
+        if not dry_run:
+            default_storage.delete(path)
+        removed.append(path)
+    return removed
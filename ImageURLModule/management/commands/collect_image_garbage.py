@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from ImageURLModule.garbage import collect
+
+
+class Command(BaseCommand):
+    help = "Delete stored images that no product, category, blog post or user refers to."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help="Keep files written within this many hours (uploads not yet attached to anything).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only list the files that would be deleted.")
+
+    def handle(self, *args, **options):
+        removed = collect(timedelta(hours=options['grace_hours']), dry_run=options['dry_run'])
+        for path in removed:
+            self.stdout.write(path)
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(removed)} file(s)."))
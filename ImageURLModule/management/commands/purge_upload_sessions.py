@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ImageURLModule.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads that have not received data for a while, with their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=settings.IMAGE_UPLOAD_SESSION_TTL_HOURS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        sessions = UploadSession.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for session in sessions.iterator():
+            session.discard()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} upload session(s)."))
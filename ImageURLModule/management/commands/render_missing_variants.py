@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ImageURLModule.processing import missing_variants, submit, variant_paths, wait_for_pending
+
+
+class Command(BaseCommand):
+    help = "Render the variants of stored originals whose variant files are missing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the images that would be rendered.")
+
+    def handle(self, *args, **options):
+        bases = list(missing_variants())
+        for base in bases:
+            self.stdout.write(base)
+            if not options['dry_run']:
+                submit(base, variant_paths(base))
+        wait_for_pending()
+        verb = "Would render" if options['dry_run'] else "Rendered"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(bases)} image(s)."))
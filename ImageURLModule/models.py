@@ -1,3 +1,32 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class UploadSession(models.Model):
+    """A resumable upload in progress; its bytes are in `temp_path` until finalized."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    @property
+    def temp_path(self):
+        return settings.IMAGE_UPLOAD_TEMP_DIR / f'{self.id}.part'
+
+    def discard(self):
+        self.temp_path.unlink(missing_ok=True)
+        self.delete()
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
@@ -0,0 +1,229 @@
+"""
+Resized, metadata-free variants of uploaded images.
+
+Each upload is checked synchronously (only the header is parsed) and the
+full-size JPEG that `image_urls` points at is rendered before the response;
+the other variants are decoded, resized and encoded on a small process-wide
+thread pool. Their URLs are deterministic and returned straight away.
+
+Variants are content-addressed: they live under the SHA-256 of the uploaded
+bytes, so uploading the same photo again reuses the stored files instead of
+writing a copy. The upload itself is stored there as `original` before the
+request returns, and the variants are rendered from it, so variants lost to
+a failed job or a restarted worker can always be rendered again (by
+uploading the same file or with the render_missing_variants command).
+"""
+import logging
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# extension -> (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'method': 4}),
+    'jpg': ('JPEG', {'optimize': True, 'progressive': True}),
+}
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PROCESSING_WORKERS, thread_name_prefix='image')
+# Request-side work for a batch (reading, hashing, checking, storage lookups)
+# runs here, so a batch takes about as long as its slowest file.
+ingest_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_UPLOAD_WORKERS, thread_name_prefix='image-ingest')
+pending = {}
+pending_lock = threading.Lock()
+
+
+class InvalidImage(Exception):
+    pass
+
+
+class ProcessingFailed(Exception):
+    pass
+
+
+def read_image(file):
+    """
+    Return the SHA-256 hex digest of the upload, hashing it chunk by chunk,
+    after checking that Pillow can parse it. Nothing is held in memory.
+    """
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise InvalidImage(file.name)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def digest_base(digest):
+    # Two-character fan-out keeps directory listings small.
+    return f'images/{digest[:2]}/{digest}'
+
+
+def original_path(base):
+    return f'{base}/original'
+
+
+def variant_paths(base):
+    return {
+        variant: {extension: f'{base}/{variant}.{extension}' for extension in FORMATS}
+        for variant in settings.IMAGE_VARIANTS
+    }
+
+
+def stored(paths):
+    return all(default_storage.exists(path) for formats in paths.values() for path in formats.values())
+
+
+def encode(image, extension):
+    image_format, options = FORMATS[extension]
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    # No exif/icc_profile arguments: the encoded file carries no metadata.
+    image.save(buffer, image_format, quality=settings.IMAGE_QUALITY, **options)
+    return buffer.getvalue()
+
+
+def save_once(path, content):
+    """
+    Save `content` under `path`. Paths are content addressed, so when a
+    concurrent writer got there first (storage then picks a suffixed name)
+    our copy is redundant and removed.
+    """
+    saved = default_storage.save(path, content)
+    if saved != path:
+        default_storage.delete(saved)
+
+
+def store_original(file, base):
+    path = original_path(base)
+    if not default_storage.exists(path):
+        # Storage copies the file chunk by chunk.
+        file.seek(0)
+        save_once(path, file)
+    return path
+
+
+def render_variants(source_path, paths):
+    with default_storage.open(source_path) as file, Image.open(file) as source:
+        # Apply the EXIF orientation before the EXIF block is dropped.
+        source = ImageOps.exif_transpose(source)
+        source = source.convert('RGBA' if 'A' in source.getbands() or 'transparency' in source.info else 'RGB')
+        for variant, formats in paths.items():
+            image = source.copy()
+            image.thumbnail(settings.IMAGE_VARIANTS[variant], Image.Resampling.LANCZOS)
+            for extension, path in formats.items():
+                # Same path, same content: an existing file is already right.
+                if not default_storage.exists(path):
+                    save_once(path, ContentFile(encode(image, extension)))
+
+
+def submit(base, paths):
+    """
+    Queue rendering of `paths` from the original stored under `base` unless
+    the files already exist or the same content is already queued in this
+    process.
+    """
+    key = paths['full']['jpg']
+    with pending_lock:
+        if key in pending:
+            return pending[key]
+        if stored(paths):
+            return None
+        future = executor.submit(render_variants, original_path(base), paths)
+        pending[key] = future
+    future.add_done_callback(lambda future: _forget(key, future))
+    return future
+
+
+def _forget(key, future):
+    # Log before leaving `pending`, so wait_for_pending() returns after it.
+    if future.exception() is not None:
+        logger.error('Rendering image variants failed', exc_info=future.exception())
+    with pending_lock:
+        pending.pop(key, None)
+
+
+def publish(base):
+    """
+    Render the full-size JPEG of the original stored under `base` now, since
+    `image_urls` hands out its URL, and queue the other variants: (paths,
+    future or None). Raises ProcessingFailed if the JPEG cannot be rendered.
+    """
+    paths = variant_paths(base)
+    primary = {'full': {'jpg': paths['full']['jpg']}}
+    if not stored(primary):
+        try:
+            render_variants(original_path(base), primary)
+        except Exception as exc:
+            raise ProcessingFailed(base) from exc
+    return paths, submit(base, paths)
+
+
+def ingest(file):
+    """Check, hash and store one upload, then publish it: (paths, future or None)."""
+    base = digest_base(read_image(file))
+    store_original(file, base)
+    return publish(base)
+
+
+def ingest_many(files):
+    """
+    Ingest `files` concurrently. Yields (paths, future, error) in the order of
+    `files`; a file that fails yields its error message instead of paths.
+    """
+    def safe_ingest(file):
+        try:
+            paths, future = ingest(file)
+        except InvalidImage:
+            return None, None, f"{file.name} is not a valid image"
+        except ProcessingFailed:
+            logger.exception('Rendering upload %s failed', file.name)
+            return None, None, f"{file.name} could not be processed"
+        except Exception:
+            logger.exception('Storing upload %s failed', file.name)
+            return None, None, f"{file.name} could not be stored"
+        return paths, future, None
+
+    return ingest_executor.map(safe_ingest, files)
+
+
+def wait_for_pending(timeout=None):
+    """
+    Block until every queued job has finished (tests, commands). Failed jobs
+    are not raised here; _forget has logged them.
+    """
+    while True:
+        with pending_lock:
+            futures = list(pending.values())
+        if not futures:
+            return
+        if wait(futures, timeout=timeout).not_done:
+            return
+
+
+def missing_variants(root='images'):
+    """Yield the base of every stored original whose variants are incomplete."""
+    try:
+        fanouts, _ = default_storage.listdir(root)
+    except FileNotFoundError:
+        return
+    for fanout in fanouts:
+        for digest in default_storage.listdir(f'{root}/{fanout}')[0]:
+            base = f'{root}/{fanout}/{digest}'
+            if default_storage.exists(original_path(base)) and not stored(variant_paths(base)):
+                yield base
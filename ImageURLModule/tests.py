@@ -1,3 +1,363 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import threading
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from BlogModule.models import Blog
+from ProductModule.models import Category, Product
+from TicketModul.models import Message, Ticket
+from . import garbage
+from .models import UploadSession
+from . import processing
+from .processing import wait_for_pending
+
+MEDIA_ROOT = tempfile.mkdtemp()
+GC_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload(name="photo.jpg", size=(2400, 1200), image_format="JPEG", mode="RGB", color="red"):
+    buffer = BytesIO()
+    image = Image.new(mode, size, color)
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    image.save(buffer, image_format, exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{image_format.lower()}")
+
+
+def stored_path(url):
+    return url.split("/Media/", 1)[1]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="staff", password="pw"))
+
+    def test_upload_creates_resized_variants_without_metadata(self):
+        response = self.client.post(reverse("image-upload"), {"image": image_upload()}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        wait_for_pending()
+
+        variants = response.data["variants"][0]
+        self.assertEqual(response.data["image_urls"], [variants["full"]["jpg"]])
+        for variant, longest in (("thumbnail", 150), ("card", 480), ("full", 1600)):
+            for extension, image_format in (("webp", "WEBP"), ("jpg", "JPEG")):
+                with default_storage.open(stored_path(variants[variant][extension])) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(max(image.size), longest)
+                    self.assertEqual(dict(image.getexif()), {})
+
+    def test_transparent_png_and_small_images(self):
+        upload = image_upload("logo.png", size=(100, 40), image_format="PNG", mode="RGBA")
+        response = self.client.post(reverse("image-upload"), {"image": upload}, format="multipart")
+        wait_for_pending()
+        with default_storage.open(stored_path(response.data["variants"][0]["full"]["jpg"])) as file:
+            # Never upscaled.
+            self.assertEqual(Image.open(file).size, (100, 40))
+
+    @override_settings(IMAGE_UPLOAD_MAX_FILES=2, IMAGE_UPLOAD_MAX_FILE_SIZE=1000)
+    def test_upload_limits(self):
+        files = [image_upload(f"{index}.jpg", size=(10, 10)) for index in range(3)]
+        response = self.client.post(reverse("image-upload"), {"image": files}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse("image-upload"), {"image": image_upload()}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_invalid_image_rejected(self):
+        upload = SimpleUploadedFile("notes.jpg", b"not an image", content_type="image/jpeg")
+        response = self.client.post(reverse("image-upload"), {"image": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "notes.jpg is not a valid image")
+
+    def test_same_content_is_stored_once(self):
+        first = self.client.post(reverse("image-upload"), {"image": image_upload(color="blue")}, format="multipart")
+        wait_for_pending()
+        path = stored_path(first.data["image_urls"][0])
+        written_at = default_storage.get_modified_time(path)
+
+        with mock.patch("ImageURLModule.processing.executor.submit") as submit:
+            second = self.client.post(
+                reverse("image-upload"), {"image": image_upload("copy.jpg", color="blue")}, format="multipart"
+            )
+        submit.assert_not_called()
+        self.assertEqual(second.data["variants"], first.data["variants"])
+        self.assertEqual(default_storage.get_modified_time(path), written_at)
+
+    def test_image_urls_work_before_the_background_job(self):
+        with mock.patch.object(processing.executor, "submit") as submit:
+            response = self.client.post(
+                reverse("image-upload"), {"image": image_upload("now.jpg", color="coral")}, format="multipart"
+            )
+        submit.assert_called_once()
+        self.assertTrue(default_storage.exists(stored_path(response.data["image_urls"][0])))
+        self.assertFalse(default_storage.exists(stored_path(response.data["variants"][0]["card"]["webp"])))
+        # Do the queued job, so no half-rendered image is left behind.
+        processing.pending.clear()
+        processing.render_variants(*submit.call_args.args[1:])
+
+    def test_lost_variants_are_rendered_from_the_original(self):
+        upload = image_upload("lost.jpg", size=(300, 200), color="purple")
+        response = self.client.post(reverse("image-upload"), {"image": upload}, format="multipart")
+        wait_for_pending()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        path = stored_path(response.data["image_urls"][0])
+        base = path.rsplit("/", 1)[0]
+        upload.seek(0)
+        with default_storage.open(processing.original_path(base)) as file:
+            self.assertEqual(file.read(), upload.read())
+        # The worker was restarted before it wrote the variants.
+        for formats in processing.variant_paths(base).values():
+            for variant_path in formats.values():
+                default_storage.delete(variant_path)
+
+        out = StringIO()
+        call_command("render_missing_variants", stdout=out)
+        self.assertIn("Rendered 1 image(s).", out.getvalue())
+        self.assertTrue(processing.stored(processing.variant_paths(base)))
+
+    def test_concurrent_store_leaves_one_original(self):
+        upload = image_upload("race.jpg", size=(30, 30), color="gold")
+        base = processing.digest_base(processing.read_image(upload))
+        self.addCleanup(default_storage.delete, processing.original_path(base))
+        processing.store_original(upload, base)
+        # A second writer checked for the original before the first saved it.
+        exists = default_storage.exists
+        stale = iter([False])
+        with mock.patch.object(default_storage, "exists", lambda name: next(stale, exists(name))):
+            processing.store_original(upload, base)
+        self.assertEqual(default_storage.listdir(base)[1], ["original"])
+
+    def test_batch_reports_each_file_in_order(self):
+        files = [
+            image_upload("a.jpg", size=(50, 50), color="navy"),
+            SimpleUploadedFile("b.jpg", b"broken", content_type="image/jpeg"),
+            image_upload("c.jpg", size=(60, 60), color="teal"),
+        ]
+        response = self.client.post(reverse("image-upload"), {"image": files}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result["name"] for result in response.data["results"]], ["a.jpg", "b.jpg", "c.jpg"])
+        self.assertEqual(response.data["results"][1]["error"], "b.jpg is not a valid image")
+        self.assertEqual(len(response.data["image_urls"]), 2)
+        wait_for_pending()
+
+    def test_batch_files_are_ingested_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        original = processing.read_image
+
+        def read_together(file):
+            barrier.wait()
+            return original(file)
+
+        files = [image_upload(f"{index}.jpg", size=(40, 40), color=(index, 0, 0)) for index in range(3)]
+        with mock.patch.object(processing, "read_image", read_together):
+            response = self.client.post(reverse("image-upload"), {"image": files}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        wait_for_pending()
+
+    def test_wait_reports_encoding_errors(self):
+        with mock.patch.object(processing, "render_variants", side_effect=OSError("disk full")), \
+                self.assertLogs("ImageURLModule.processing", "ERROR"):
+            response = self.client.post(
+                reverse("image-upload") + "?wait=true",
+                {"image": image_upload("fail.jpg", size=(30, 30), color="olive")}, format="multipart"
+            )
+            wait_for_pending()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "fail.jpg could not be processed")
+
+
+@override_settings(MEDIA_ROOT=GC_MEDIA_ROOT)
+class ImageGarbageCollectionTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(GC_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="staff", password="pw"))
+
+    def upload(self, color):
+        response = self.client.post(reverse("image-upload"), {"image": image_upload(color=color)}, format="multipart")
+        wait_for_pending()
+        return response.data["variants"][0]
+
+    def test_unreferenced_variants_are_removed(self):
+        kept, blogged, dropped = self.upload("green"), self.upload("yellow"), self.upload("purple")
+        attached = self.upload("olive")
+        default_storage.save("images/عکس قدیمی.jpg", ContentFile(b"legacy"))
+        legacy_url = "http://testserver/Media/images/" + quote("عکس قدیمی.jpg")
+        category = Category.objects.create(name="Accessories", image={"url": "images/legacy.jpg"})
+        Product.objects.create(
+            category=category,
+            name="Old rack", price=10, stock=1, product_type="Rack", brand="Iron", material="Steel",
+            product_weight=1, weight=1, dimensions="1x1", description="Rack", warranty="none",
+            images=[legacy_url]
+        )
+        Blog.objects.create(title="Old post", content=f'<img src="{legacy_url}" alt="legacy">')
+        self.assertIn("images/عکس قدیمی.jpg", garbage.referenced_paths())
+        Product.objects.create(
+            category=category,
+            name="Shaker", price=10, stock=1, product_type="Shaker", brand="Mix", material="Plastic",
+            product_weight=1, weight=1, dimensions="1x1", description="Shaker", warranty="none",
+            images=[kept["card"]["webp"]]
+        )
+        Blog.objects.create(title="Post", content=f'<img src="{blogged["full"]["jpg"]}" alt="shake">')
+        customer = get_user_model().objects.create_user(username="customer", password="pw")
+        ticket = Ticket.objects.create(
+            subject="Broken shaker", customer=customer, created_at=timezone.now(), updated_at=timezone.now()
+        )
+        Message.objects.create(
+            ticket=ticket, sender="customer", text="Photo", message="Photo", timestamp=timezone.now(),
+            file_url=attached["full"]["jpg"]
+        )
+
+        # Fresh uploads are protected by the grace period.
+        self.assertEqual(garbage.collect(), [])
+
+        later = timezone.now() + timedelta(days=2)
+        with mock.patch("ImageURLModule.garbage.timezone.now", return_value=later):
+            out = StringIO()
+            call_command("collect_image_garbage", "--dry-run", stdout=out)
+            # Six variants plus the original.
+            self.assertIn("Would delete 7 file(s).", out.getvalue())
+            removed = garbage.collect()
+
+        self.assertEqual(len(removed), 7)
+        for formats in dropped.values():
+            for url in formats.values():
+                self.assertFalse(default_storage.exists(stored_path(url)))
+        self.assertTrue(default_storage.exists("images/عکس قدیمی.jpg"))
+        for variants in (kept, blogged, attached):
+            for formats in variants.values():
+                for url in formats.values():
+                    self.assertTrue(default_storage.exists(stored_path(url)))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_UPLOAD_TEMP_DIR=Path(MEDIA_ROOT) / "upload_tmp")
+class ChunkedUploadTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username="uploader", password="pw")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("image-upload-chunked")
+        self.data = image_upload("big.jpg", size=(800, 600), color="orange").read()
+
+    def start(self, **extra):
+        payload = {
+            "filename": "big.jpg", "size": len(self.data), "sha256": hashlib.sha256(self.data).hexdigest(), **extra
+        }
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def put_chunk(self, upload_id, offset, chunk):
+        return self.client.put(
+            f"{self.url}?id={upload_id}&offset={offset}", chunk, content_type="application/octet-stream"
+        )
+
+    def test_resumable_upload(self):
+        upload_id = self.start()
+        middle = len(self.data) // 2
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:middle]).data["offset"], middle)
+
+        # A chunk that skips ahead is refused and the client resumes from GET.
+        response = self.put_chunk(upload_id, middle + 10, self.data[middle + 10:])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        offset = self.client.get(f"{self.url}?id={upload_id}").data["offset"]
+        self.assertEqual(self.put_chunk(upload_id, offset, self.data[offset:]).data["offset"], len(self.data))
+
+        temp_path = UploadSession.objects.get(id=upload_id).temp_path
+        response = self.client.post(f"{self.url}?id={upload_id}", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        wait_for_pending()
+        self.assertTrue(default_storage.exists(stored_path(response.data["image_urls"][0])))
+        self.assertFalse(UploadSession.objects.filter(id=upload_id).exists())
+        self.assertFalse(temp_path.exists())
+        base = stored_path(response.data["image_urls"][0]).rsplit("/", 1)[0]
+        with default_storage.open(processing.original_path(base)) as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_finalize_streams_the_file(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data)
+        # Queued jobs get the stored original's path, never the file's bytes.
+        with mock.patch.object(processing.executor, "submit", wraps=processing.executor.submit) as submit:
+            response = self.client.post(f"{self.url}?id={upload_id}", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn(self.data, submit.call_args.args)
+        self.assertTrue(submit.call_args.args[1].endswith("/original"))
+        wait_for_pending()
+
+    def test_malformed_session_id(self):
+        for method in (self.client.get, self.client.post, self.client.delete):
+            response = method(f"{self.url}?id=bogus")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.put_chunk("bogus", 0, b"x").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_checksum_is_required(self):
+        for sha256 in (None, "", "abc"):
+            payload = {"filename": "big.jpg", "size": len(self.data)}
+            if sha256 is not None:
+                payload["sha256"] = sha256
+            response = self.client.post(self.url, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_checksum_mismatch(self):
+        upload_id = self.start(sha256="0" * 64)
+        self.put_chunk(upload_id, 0, self.data)
+        response = self.client.post(f"{self.url}?id={upload_id}", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Checksum mismatch")
+
+    def test_incomplete_upload_and_abort(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data[:100])
+        response = self.client.post(f"{self.url}?id={upload_id}", {}, format="json")
+        self.assertEqual(response.data, {"error": "Upload is incomplete", "offset": 100})
+
+        self.assertEqual(self.client.delete(f"{self.url}?id={upload_id}").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f"{self.url}?id={upload_id}").status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(IMAGE_UPLOAD_MAX_CHUNK_SIZE=100, IMAGE_UPLOAD_MAX_SESSIONS=1)
+    def test_limits(self):
+        upload_id = self.start()
+        response = self.put_chunk(upload_id, 0, self.data[:101])
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        response = self.client.post(self.url, {"filename": "other.jpg", "size": 10, "sha256": "0" * 64}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_sessions_are_private(self):
+        upload_id = self.start()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="other", password="pw"))
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data).status_code, status.HTTP_404_NOT_FOUND)
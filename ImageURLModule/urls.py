@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import ImageUploadView
+from .views import ImageUploadView, ChunkedUploadView
 
 urlpatterns = [
     path('', ImageUploadView.as_view(), name='image-upload'),
+    path('chunked/', ChunkedUploadView.as_view(), name='image-upload-chunked'),
 ]
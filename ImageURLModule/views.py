@@ -1,8 +1,33 @@
+import logging
+import re
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.core.files.storage import default_storage
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UploadSession
+from .processing import InvalidImage, ProcessingFailed, digest_base, ingest_many, publish, read_image, store_original
+
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+
+logger = logging.getLogger(__name__)
+
+
+def media_url(request, path):
+    return request.build_absolute_uri(settings.MEDIA_URL + path)
+
+
+def variant_urls(request, paths):
+    return {
+        variant: {extension: media_url(request, path) for extension, path in formats.items()}
+        for variant, formats in paths.items()
+    }
+
 
 class ImageUploadView(APIView):
     def post(self, request, *args, **kwargs):
@@ -10,11 +35,174 @@ class ImageUploadView(APIView):
             return Response({"error": "No image provided"}, status=status.HTTP_400_BAD_REQUEST)
 
         files = request.FILES.getlist('image')
-        image_urls = []
-
+        if len(files) > settings.IMAGE_UPLOAD_MAX_FILES:
+            return Response(
+                {"error": f"At most {settings.IMAGE_UPLOAD_MAX_FILES} images per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         for file in files:
-            file_path = default_storage.save(f"images/{file.name}", file)
-            full_url = request.build_absolute_uri(settings.MEDIA_URL + file_path)
-            image_urls.append(full_url)
+            if file.size > settings.IMAGE_UPLOAD_MAX_FILE_SIZE:
+                return Response(
+                    {"error": f"{file.name} is larger than {settings.IMAGE_UPLOAD_MAX_FILE_SIZE} bytes"},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+
+        # Encoding happens in the background unless ?wait=true, in which case
+        # encoding failures are reported per file as well.
+        wait = request.query_params.get('wait') == 'true'
+        results = []
+        for file, (paths, future, error) in zip(files, ingest_many(files)):
+            if error is None and wait and future is not None:
+                try:
+                    future.result()
+                except Exception:
+                    error = f"{file.name} could not be processed"
+            if error is None:
+                results.append({"name": file.name, "variants": variant_urls(request, paths)})
+            else:
+                results.append({"name": file.name, "error": error})
+
+        stored = [result["variants"] for result in results if "variants" in result]
+        if not stored:
+            return Response({"error": results[0]["error"], "results": results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"image_urls": [urls['full']['jpg'] for urls in stored], "variants": stored, "results": results},
+            status=status.HTTP_201_CREATED if len(stored) == len(results) else status.HTTP_207_MULTI_STATUS
+        )
+
+
+class ChunkedUploadView(APIView):
+    """
+    Resumable uploads for large images:
+
+    POST                      start a session: {"filename", "size", "sha256"}
+    PUT    ?id=&offset=       append the raw request body at `offset`
+    GET    ?id=               current offset, to resume after a failure
+    POST   ?id=               finalize: verify size and checksum, then store
+    DELETE ?id=               abort
+    """
+
+    def get_session(self, request):
+        try:
+            return UploadSession.objects.get(id=request.query_params.get('id'), user=request.user)
+        except (UploadSession.DoesNotExist, ValidationError, ValueError, KeyError):
+            return None
+
+    def session_data(self, session):
+        return {
+            "id": str(session.id), "filename": session.filename, "size": session.size,
+            "offset": session.received, "chunk_size": settings.IMAGE_UPLOAD_MAX_CHUNK_SIZE,
+        }
+
+    def get(self, request, *args, **kwargs):
+        session = self.get_session(request)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.session_data(session), status=status.HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        if 'id' in request.query_params:
+            return self.finalize(request)
+
+        filename = request.data.get('filename')
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = None
+        if not filename or size is None or size <= 0:
+            return Response({"error": "filename and a positive size are required"}, status=status.HTTP_400_BAD_REQUEST)
+        sha256 = str(request.data.get('sha256') or '').lower()
+        if not SHA256_RE.fullmatch(sha256):
+            return Response({"error": "sha256 of the file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if size > settings.IMAGE_UPLOAD_MAX_FILE_SIZE:
+            return Response(
+                {"error": f"{filename} is larger than {settings.IMAGE_UPLOAD_MAX_FILE_SIZE} bytes"},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        if UploadSession.objects.filter(user=request.user).count() >= settings.IMAGE_UPLOAD_MAX_SESSIONS:
+            return Response({"error": "Too many unfinished uploads"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        session = UploadSession.objects.create(
+            user=request.user, filename=filename[:255], size=size, sha256=sha256
+        )
+        settings.IMAGE_UPLOAD_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+        session.temp_path.touch()
+        return Response(self.session_data(session), status=status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        session = self.get_session(request)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.query_params.get('offset'))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return Response({"error": "offset and Content-Length are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if offset != session.received:
+            return Response(
+                {"error": "Chunk does not continue the upload", "offset": session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        if length > settings.IMAGE_UPLOAD_MAX_CHUNK_SIZE or offset + length > session.size:
+            return Response({"error": "Chunk too large"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # Stream the body to disk in fixed-size blocks; only one block is ever
+        # held in memory, however large the chunk.
+        written = 0
+        with open(session.temp_path, 'r+b') as part:
+            part.seek(offset)
+            while written < length:
+                block = request.stream.read(min(settings.IMAGE_UPLOAD_READ_SIZE, length - written))
+                if not block:
+                    break
+                part.write(block)
+                written += len(block)
+
+        # Conditional on the offset, so a duplicated retry cannot count twice.
+        UploadSession.objects.filter(id=session.id, received=offset).update(
+            received=F('received') + written, updated_at=timezone.now()
+        )
+        session.refresh_from_db(fields=['received'])
+        return Response(self.session_data(session), status=status.HTTP_200_OK)
+
+    def finalize(self, request):
+        session = self.get_session(request)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        if session.received != session.size:
+            return Response(
+                {"error": "Upload is incomplete", "offset": session.received},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # One streaming pass hashes and checks the file, which is then copied
+        # to storage; the encoders read it back from there.
+        with open(session.temp_path, 'rb') as part:
+            upload = File(part, name=session.filename)
+            try:
+                digest = read_image(upload)
+            except InvalidImage:
+                digest = None
+            if digest is not None and digest == session.sha256:
+                base = digest_base(digest)
+                store_original(upload, base)
+        session.discard()
+        if digest is None:
+            return Response({"error": f"{session.filename} is not a valid image"}, status=status.HTTP_400_BAD_REQUEST)
+        if digest != session.sha256:
+            return Response({"error": "Checksum mismatch"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            paths, _ = publish(base)
+        except ProcessingFailed:
+            logger.exception('Rendering upload %s failed', session.filename)
+            return Response({"error": f"{session.filename} could not be processed"}, status=status.HTTP_400_BAD_REQUEST)
+        variants = variant_urls(request, paths)
+        return Response({"image_urls": [variants['full']['jpg']], "variants": [variants]}, status=status.HTTP_201_CREATED)
 
-        return Response({"image_urls": image_urls}, status=status.HTTP_201_CREATED)
+    def delete(self, request, *args, **kwargs):
+        session = self.get_session(request)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        session.discard()
+        return Response({"message": "Upload aborted"}, status=status.HTTP_200_OK)
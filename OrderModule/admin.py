@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem, DiscountCode
+from .models import Order, OrderItem, DiscountCode, DailyRevenue
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -29,3 +29,11 @@ class DiscountCodeAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'product', 'quantity')
     search_fields = ('order__order_id', 'product__name')
+
+
+@admin.register(DailyRevenue)
+class DailyRevenueAdmin(admin.ModelAdmin):
+    list_display = ('date', 'order_status', 'method', 'order_count', 'total')
+    list_filter = ('order_status', 'method')
+    date_hierarchy = 'date'
+    ordering = ('-date',)
@@ -0,0 +1,84 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, Count, DateField, F, FloatField, Max, Min, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Least, Round
+from django.utils import timezone
+
+from UserModule.models import User
+from .models import Order
+
+# Orders that count as a purchase in the customer statistics.
+PURCHASE_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+def whole_amount(total):
+    # User.total_spent is an integer column; round the same way SQL ROUND does.
+    return int(Decimal(total or 0).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def purchase_row(values):
+    """(customer id, amount, day) when the order counts as a purchase, else None."""
+    if values.get('order_status') not in PURCHASE_STATUSES or values.get('customer_id') is None:
+        return None
+    return values['customer_id'], whole_amount(values['total']), timezone.localdate(values['order_date'])
+
+
+def add_purchase(customer_id, amount, day):
+    orders = Coalesce(F('total_orders'), 0) + 1
+    spent = Coalesce(F('total_spent'), 0) + amount
+    day = Value(day, output_field=DateField())
+    User.objects.filter(pk=customer_id).update(
+        total_orders=orders,
+        total_spent=spent,
+        average_order_value=Cast(spent, FloatField()) / orders,
+        first_purchase_date=Least(Coalesce(F('first_purchase_date'), day), day),
+        last_purchase_date=Greatest(Coalesce(F('last_purchase_date'), day), day),
+    )
+
+
+def remove_purchase(customer_id, amount, day):
+    orders = Coalesce(F('total_orders'), 0) - 1
+    spent = Coalesce(F('total_spent'), 0) - amount
+    # The boundary dates cannot be rolled back arithmetically, so re-read
+    # them from this customer's remaining purchases.
+    dates = Order.objects.filter(
+        customer_id=customer_id, order_status__in=PURCHASE_STATUSES
+    ).aggregate(first=Min('order_date'), last=Max('order_date'))
+    User.objects.filter(pk=customer_id).update(
+        total_orders=orders,
+        total_spent=spent,
+        average_order_value=Case(
+            When(total_orders__gt=1, then=Cast(spent, FloatField()) / orders),
+            default=None,
+            output_field=FloatField(),
+        ),
+        first_purchase_date=dates['first'] and timezone.localdate(dates['first']),
+        last_purchase_date=dates['last'] and timezone.localdate(dates['last']),
+    )
+
+
+def recompute_customer_stats(user_ids):
+    """Rebuild the purchase statistics of `user_ids` from the Order table."""
+    stats = {
+        row['customer_id']: row
+        for row in Order.objects.filter(customer_id__in=user_ids, order_status__in=PURCHASE_STATUSES)
+        .values('customer_id')
+        .annotate(
+            count=Count('id'), spent=Sum(Round('total')),
+            first=Min('order_date'), last=Max('order_date'),
+        )
+        .order_by()
+    }
+    users = list(User.objects.filter(id__in=user_ids).only('id'))
+    for user in users:
+        row = stats.get(user.id)
+        user.total_orders = row['count'] if row else 0
+        user.total_spent = int(row['spent']) if row else 0
+        user.average_order_value = user.total_spent / user.total_orders if row else None
+        user.first_purchase_date = timezone.localdate(row['first']) if row else None
+        user.last_purchase_date = timezone.localdate(row['last']) if row else None
+    User.objects.bulk_update(users, [
+        'total_orders', 'total_spent', 'average_order_value',
+        'first_purchase_date', 'last_purchase_date',
+    ])
+    return len(users)
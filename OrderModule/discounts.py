@@ -0,0 +1,60 @@
+"""
+In-process cache of the discount codes that are currently usable.
+
+Every process keeps all active codes in a dict for
+DISCOUNT_CODE_CACHE_TTL seconds, so coupon checks, including checks of
+codes that do not exist, need no query. Saving or deleting a DiscountCode
+invalidates the local copy at once; other processes pick it up when their
+TTL runs out.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DiscountCode
+
+_lock = threading.Lock()
+_codes = {}
+_expires_at = 0.0
+_generation = 0
+
+
+def invalidate():
+    global _expires_at, _generation
+    with _lock:
+        _expires_at = 0.0
+        _generation += 1
+
+
+def _load():
+    global _codes, _expires_at
+    with _lock:
+        generation = _generation
+    now = timezone.now()
+    codes = {
+        discount.code: discount
+        for discount in DiscountCode.objects.filter(Q(expire_date__isnull=True) | Q(expire_date__gt=now))
+    }
+    with _lock:
+        # Skip the refresh window if a write invalidated us mid-load.
+        _codes = codes
+        if generation == _generation:
+            _expires_at = time.monotonic() + settings.DISCOUNT_CODE_CACHE_TTL
+    return codes
+
+
+def active_codes():
+    if time.monotonic() >= _expires_at:
+        return _load()
+    return _codes
+
+
+def get_active_discount(code):
+    """The DiscountCode for `code` if it exists and has not expired, else None."""
+    discount = active_codes().get(code.strip())
+    if discount is None or (discount.expire_date and discount.expire_date <= timezone.now()):
+        return None
+    return discount
@@ -0,0 +1,19 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from OrderModule.revenue import rebuild_daily_revenue
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyRevenue rollup from the Order table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=date.fromisoformat,
+            help="Only rebuild days on or after this date (YYYY-MM-DD)."
+        )
+
+    def handle(self, *args, **options):
+        buckets = rebuild_daily_revenue(since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {buckets} daily revenue rows."))
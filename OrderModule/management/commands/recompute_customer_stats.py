@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from OrderModule.customer_stats import recompute_customer_stats
+from UserModule.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute the purchase statistics stored on every User from the Order table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            total += recompute_customer_stats(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Recomputed statistics for {total} users."))
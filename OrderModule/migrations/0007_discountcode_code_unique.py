@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OrderModule', '0006_dailyrevenue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='discountcode',
+            name='code',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
@@ -8,7 +8,7 @@ DELIVERY_METHOD_CHOICES = [
 ]
 
 class DiscountCode(models.Model):
-    code = models.CharField(max_length=20)
+    code = models.CharField(max_length=20, unique=True)
     percentage = models.DecimalField(max_digits=10, decimal_places=2)
     expire_date = models.DateTimeField(null=True, blank=True)
 
@@ -59,6 +59,12 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     shipped_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['customer', 'order_status'], name='order_customer_status_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.order_id} - {self.order_status}"
 
@@ -69,3 +75,18 @@ class OrderItem(models.Model):
 
     class Meta:
         unique_together = ('order', 'product')
+
+
+class DailyRevenue(models.Model):
+    """Orders summed per day, status and delivery method; kept current by OrderModule.signals."""
+    date = models.DateField()
+    order_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    method = models.CharField(max_length=10, choices=DELIVERY_METHOD_CHOICES)
+    order_count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'order_status', 'method')
+
+    def __str__(self):
+        return f"{self.date} {self.order_status}/{self.method}: {self.total}"
@@ -0,0 +1,5 @@
+from AllMaxSportWebApp.pagination import KeysetPagination
+
+
+class OrderCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,70 @@
+import calendar
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRevenue, Order
+
+def revenue_row(values):
+    """(bucket key, total) for an order's field values, or None if it has not been saved yet."""
+    if values.get('created_at') is None:
+        return None
+    day = timezone.localdate(values['created_at'])
+    return (day, values['order_status'], values['method']), values['total'] or 0
+
+
+def record(key, count, amount):
+    """Add `count` orders worth `amount` to one DailyRevenue bucket."""
+    day, order_status, method = key
+    bucket = DailyRevenue.objects.filter(date=day, order_status=order_status, method=method)
+    changes = {'order_count': F('order_count') + count, 'total': F('total') + amount}
+    if bucket.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            DailyRevenue.objects.create(
+                date=day, order_status=order_status, method=method, order_count=count, total=amount
+            )
+    except IntegrityError:
+        # Another writer created the bucket between our UPDATE and INSERT.
+        bucket.update(**changes)
+
+
+def rebuild_daily_revenue(since=None):
+    """Recompute the rollup from the Order table, for every day or from `since` on."""
+    orders = Order.objects.all()
+    buckets = DailyRevenue.objects.all()
+    if since is not None:
+        orders = orders.filter(created_at__date__gte=since)
+        buckets = buckets.filter(date__gte=since)
+    rows = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('day', 'order_status', 'method')
+        .annotate(order_count=Count('id'), revenue=Sum('total'))
+        .order_by()
+    )
+    with transaction.atomic():
+        buckets.delete()
+        created = DailyRevenue.objects.bulk_create([
+            DailyRevenue(
+                date=row['day'], order_status=row['order_status'], method=row['method'],
+                order_count=row['order_count'], total=row['revenue'] or 0,
+            )
+            for row in rows
+        ], batch_size=500)
+    return len(created)
+
+
+def months_ago(day, months):
+    """The same day-of-month `months` calendar months earlier, clamped to that month's length."""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def revenue_since(day):
+    return DailyRevenue.objects.filter(date__gte=day).aggregate(total_sum=Sum('total'))['total_sum'] or 0
@@ -1,6 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Order, OrderItem, DiscountCode
-from ProductModule.models import Product
+from ProductModule.models import Product, InsufficientStock
+from .signals import load_missing_state
+
+def adjust_stock(before, after):
+    """
+    Move stock from the {product_id: quantity} an order held to what it holds
+    now: the extra units are reserved, the dropped ones released.
+    """
+    reserve, release = {}, {}
+    for product_id in set(before) | set(after):
+        delta = after.get(product_id, 0) - before.get(product_id, 0)
+        if delta > 0:
+            reserve[product_id] = delta
+        elif delta < 0:
+            release[product_id] = -delta
+    Product.objects.release_stock(release)
+    try:
+        Product.objects.reserve_stock(reserve)
+    except InsufficientStock as exc:
+        raise serializers.ValidationError({'items': [str(exc)]})
+
+
+def holds_stock(order_status):
+    return order_status != 'cancelled'
+
 
 class DiscountCodeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -18,7 +45,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
 class CreateOrderItemSerializer(serializers.Serializer):
     id = serializers.IntegerField()
-    quantity = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(source='order_items', many=True, read_only=True)
@@ -48,25 +75,123 @@ class CreateOrderSerializer(serializers.ModelSerializer):
             'shipping', 'tax', 'total', 'address', 'postal_code', 'items'
         ]
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        self.line_items = None
+        if 'items' in self.initial_data:
+            self.line_items = self.resolve_items(self.initial_data['items'])
+        return attrs
+
+    def resolve_items(self, items_data):
+        """
+        Validate the posted items and return {product: quantity}, fetching
+        every product in a single query. Repeated ids are merged because an
+        order holds one row per product.
+        """
+        serializer = CreateOrderItemSerializer(data=items_data, many=True)
+        if not serializer.is_valid():
+            raise serializers.ValidationError({'items': serializer.errors})
+
+        quantities = {}
+        for item in serializer.validated_data:
+            quantities[item['id']] = quantities.get(item['id'], 0) + item['quantity']
+
+        products = Product.objects.in_bulk(list(quantities))
+        missing = [str(product_id) for product_id in quantities if product_id not in products]
+        if missing:
+            raise serializers.ValidationError(
+                {'items': [f"Unknown product id(s): {', '.join(missing)}"]}
+            )
+        return {products[product_id]: quantity for product_id, quantity in quantities.items()}
+
     def create(self, validated_data):
-        items_data = self.initial_data.get('items', [])
         validated_data.pop('items', None)
-        order = Order.objects.create(**validated_data)
-        for item in items_data:
-            product = Product.objects.get(id=item['id'])
-            OrderItem.objects.create(order=order, product=product, quantity=item['quantity'])
+        line_items = self.line_items or {}
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=quantity)
+                for product, quantity in line_items.items()
+            ])
+            if holds_stock(order.order_status):
+                adjust_stock({}, {product.id: quantity for product, quantity in line_items.items()})
         return order
 
     def update(self, instance, validated_data):
-        items_data = self.initial_data.get('items', [])
         validated_data.pop('items', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if items_data is not None:
-            instance.order_items.all().delete()
-            for item in items_data:
-                product = Product.objects.get(id=item['id'])
-                OrderItem.objects.create(order=instance, product=product, quantity=item['quantity'])
+        with transaction.atomic():
+            fields = [*validated_data]
+            if 'order_status' in validated_data:
+                was_holding = holds_stock(self.claim_status(instance, validated_data['order_status']))
+                # The claim already wrote the status and updated_at.
+                fields.remove('order_status')
+            else:
+                was_holding = holds_stock(instance.order_status)
+                fields.append('updated_at')
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if fields:
+                instance.save(update_fields=fields)
+            else:
+                # Nothing is left to write, but the rollups must still follow the new status.
+                post_save.send(
+                    sender=Order, instance=instance, created=False, raw=False,
+                    using=instance._state.db, update_fields=frozenset(['order_status', 'updated_at']),
+                )
+
+            is_holding = holds_stock(instance.order_status)
+            if self.line_items is None and was_holding == is_holding:
+                return instance
+
+            existing = {item.product_id: item for item in instance.order_items.all()}
+            before = {product_id: item.quantity for product_id, item in existing.items()}
+            after = before
+            if self.line_items is not None:
+                after = {product.id: quantity for product, quantity in self.line_items.items()}
+                self.apply_item_changes(instance, existing, after)
+
+            adjust_stock(before if was_holding else {}, after if is_holding else {})
         return instance
+
+    @staticmethod
+    def claim_status(order, new_status):
+        """
+        Move `order` to `new_status` with a conditional UPDATE, stamping
+        updated_at, and return the status it really had just before. `order`
+        may be stale: of two concurrent changes (e.g. retried payment
+        callbacks) only one matches the old status, the other sees the new
+        one, so stock moves once. The rollup snapshot is corrected to the
+        real old status so the rollups count the change once as well.
+        """
+        load_missing_state(Order, order)
+        old_status = order.order_status
+        now = timezone.now()
+        while not Order.objects.filter(pk=order.pk, order_status=old_status).update(
+            order_status=new_status, updated_at=now
+        ):
+            old_status = Order.objects.filter(pk=order.pk).values_list('order_status', flat=True).get()
+        order.updated_at = now
+        if order._saved_state is not None:
+            order._saved_state['order_status'] = old_status
+        return old_status
+
+    @staticmethod
+    def apply_item_changes(order, existing, wanted):
+        """Bring the order's rows from `existing` to {product_id: quantity} touching only what changed."""
+        added = [
+            OrderItem(order=order, product_id=product_id, quantity=quantity)
+            for product_id, quantity in wanted.items() if product_id not in existing
+        ]
+        changed = []
+        for product_id, item in existing.items():
+            if product_id in wanted and item.quantity != wanted[product_id]:
+                item.quantity = wanted[product_id]
+                changed.append(item)
+        removed = [product_id for product_id in existing if product_id not in wanted]
+
+        if added:
+            OrderItem.objects.bulk_create(added)
+        if changed:
+            OrderItem.objects.bulk_update(changed, ['quantity'])
+        if removed:
+            order.order_items.filter(product_id__in=removed).delete()
@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .customer_stats import add_purchase, purchase_row, remove_purchase
+from .discounts import invalidate as invalidate_discount_codes
+from ProductModule.models import Product
+
+from .models import DiscountCode, Order
+from .revenue import record, revenue_row
+
+# Fields whose last saved values the rollups need to move an order out of
+# its old bucket.
+SNAPSHOT_FIELDS = ('created_at', 'order_status', 'method', 'total', 'customer_id', 'order_date')
+
+
+def take_snapshot(instance):
+    # Read __dict__ so deferred fields are never fetched just for this.
+    loaded = instance.__dict__
+    if instance.pk is not None and all(field in loaded for field in SNAPSHOT_FIELDS):
+        instance._saved_state = {field: loaded[field] for field in SNAPSHOT_FIELDS}
+    else:
+        instance._saved_state = None
+
+
+def current_state(instance):
+    return {field: getattr(instance, field) for field in SNAPSHOT_FIELDS}
+
+
+@receiver(post_init, sender=Order)
+def remember_saved_state(sender, instance, **kwargs):
+    take_snapshot(instance)
+
+
+@receiver(pre_save, sender=Order)
+def load_missing_state(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and getattr(instance, '_saved_state', None) is None:
+        instance._saved_state = Order.objects.filter(pk=instance.pk).values(*SNAPSHOT_FIELDS).first()
+
+
+@receiver(post_save, sender=Order)
+def update_order_rollups(sender, instance, created, **kwargs):
+    before = {} if created else (instance._saved_state or {})
+    after = current_state(instance)
+
+    previous, current = revenue_row(before), revenue_row(after)
+    if previous != current:
+        if previous is not None:
+            record(previous[0], -1, -previous[1])
+        if current is not None:
+            record(current[0], 1, current[1])
+
+    previous, current = purchase_row(before), purchase_row(after)
+    if previous != current:
+        if previous is not None:
+            remove_purchase(*previous)
+        if current is not None:
+            add_purchase(*current)
+
+    take_snapshot(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def release_deleted_order_stock(sender, instance, **kwargs):
+    # Cancel with a conditional UPDATE first, so a concurrent delete or
+    # cancellation of the same order cannot release its stock again.
+    if Order.objects.filter(pk=instance.pk).exclude(order_status='cancelled').update(order_status='cancelled'):
+        Product.objects.release_stock(dict(instance.order_items.values_list('product_id', 'quantity')))
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    state = instance._saved_state or current_state(instance)
+    row = revenue_row(state)
+    if row is not None:
+        record(row[0], -1, -row[1])
+    row = purchase_row(state)
+    if row is not None:
+        remove_purchase(*row)
+
+
+@receiver(post_save, sender=DiscountCode)
+@receiver(post_delete, sender=DiscountCode)
+def discount_code_changed(sender, **kwargs):
+    invalidate_discount_codes()
+    transaction.on_commit(invalidate_discount_codes)
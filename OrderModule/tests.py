@@ -1,12 +1,19 @@
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from io import StringIO
 
 from UserModule.models import User
 from ProductModule.models import Product, Category
-from .models import Order, OrderItem, DiscountCode
+from .models import Order, OrderItem, DiscountCode, DailyRevenue
+from .revenue import months_ago
+from .serializers import CreateOrderSerializer
+from .discounts import get_active_discount
 
 
 class OrderAPITest(TestCase):
@@ -127,3 +134,355 @@ class OrderAPITest(TestCase):
         response = self.client.delete(self.api_path + f"?id={order.id}")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Order.objects.filter(id=order.id).exists())
+
+    def order_payload(self, order_id, items):
+        return {
+            "order_id": order_id,
+            "order_date": timezone.now(),
+            "order_status": "pending_payment",
+            "carrier": "UPS",
+            "estimated_delivery_date": timezone.now() + timedelta(days=4),
+            "method": "standard",
+            "code": 4321,
+            "subtotal": 100,
+            "shipping": 10,
+            "tax": 5,
+            "total": 115,
+            "items": items,
+        }
+
+    def test_create_order_merges_repeated_products(self):
+        other = Product.objects.create(
+            name="Other Product", price=50, stock=10, category=self.category, product_type="Test",
+            brand="Brand", material="Material", product_weight=5, weight=5, dimensions="1x1x1",
+            description="Other", warranty="1 year"
+        )
+        self.client.force_authenticate(user=self.user)
+        items = [
+            {"id": self.product.id, "quantity": 1},
+            {"id": other.id, "quantity": 2},
+            {"id": self.product.id, "quantity": 3},
+        ]
+        response = self.client.post(self.api_path, self.order_payload("ORD555", items), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        quantities = dict(
+            OrderItem.objects.filter(order__order_id="ORD555").values_list("product_id", "quantity")
+        )
+        self.assertEqual(quantities, {self.product.id: 4, other.id: 2})
+
+    def test_create_order_unknown_product_is_rejected(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 1}, {"id": 999999, "quantity": 1}]
+        response = self.client.post(self.api_path, self.order_payload("ORD556", items), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("items", response.data)
+        self.assertFalse(Order.objects.filter(order_id="ORD556").exists())
+
+    def test_checkout_reserves_stock_and_counts_sales(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 3}]
+        response = self.client.post(self.api_path, self.order_payload("ORD557", items), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sales), (7, 3))
+
+    def test_oversold_cart_is_rejected_without_side_effects(self):
+        other = Product.objects.create(
+            name="Scarce Product", price=50, stock=1, category=self.category, product_type="Test",
+            brand="Brand", material="Material", product_weight=5, weight=5, dimensions="1x1x1",
+            description="Scarce", warranty="1 year"
+        )
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 2}, {"id": other.id, "quantity": 2}]
+        response = self.client.post(self.api_path, self.order_payload("ORD558", items), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other.id), response.data["items"][0])
+        self.assertFalse(Order.objects.filter(order_id="ORD558").exists())
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sales), (10, 0))
+
+    def test_cancelling_order_restores_stock(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 4}]
+        self.client.post(self.api_path, self.order_payload("ORD559", items), format='json')
+        order = Order.objects.get(order_id="ORD559")
+
+        response = self.client.patch(
+            self.api_path + f"?id={order.id}", {"order_status": "cancelled", "items": items}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sales), (10, 0))
+
+    def test_repeated_cancellation_releases_stock_once(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 4}]
+        self.client.post(self.api_path, self.order_payload("ORD561", items), format='json')
+        # Both requests loaded the order before either saved it.
+        first, second = Order.objects.get(order_id="ORD561"), Order.objects.get(order_id="ORD561")
+        for order in (first, second):
+            serializer = CreateOrderSerializer(order, data={"order_status": "cancelled"}, partial=True)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sales), (10, 0))
+
+    def test_stale_status_changes_count_once_in_the_rollups(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 1}]
+        self.client.post(self.api_path, self.order_payload("ORD564", items), format='json')
+        # A retried payment callback: both loaded the order while it was pending.
+        first, second = Order.objects.get(order_id="ORD564"), Order.objects.get(order_id="ORD564")
+        for order in (first, second):
+            serializer = CreateOrderSerializer(order, data={"order_status": "paid"}, partial=True)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save()
+
+        buckets = {
+            row.order_status: (row.order_count, row.total)
+            for row in DailyRevenue.objects.exclude(order_count=0, total=0)
+        }
+        total = Order.objects.get(order_id="ORD564").total
+        self.assertEqual(buckets, {"paid": (1, total)})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_orders, self.user.total_spent), (1, total))
+
+    def test_deleting_order_releases_stock(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 4}]
+        self.client.post(self.api_path, self.order_payload("ORD562", items), format='json')
+        self.client.post(self.api_path, self.order_payload("ORD563", items), format='json')
+        order = Order.objects.get(order_id="ORD562")
+
+        response = self.client.delete(self.api_path + f"?id={order.id}")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sales), (6, 4))
+
+        # A cancelled order no longer holds anything.
+        order = Order.objects.get(order_id="ORD563")
+        self.client.patch(self.api_path + f"?id={order.id}", {"order_status": "cancelled"}, format='json')
+        order.delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.sales), (10, 0))
+
+    def test_status_patch_leaves_items_untouched(self):
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 2}]
+        self.client.post(self.api_path, self.order_payload("ORD560", items), format='json')
+        order = Order.objects.get(order_id="ORD560")
+        item_id = order.order_items.get().id
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch(self.api_path + f"?id={order.id}", {"order_status": "paid"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        writes = [q['sql'] for q in captured.captured_queries if not q['sql'].startswith('SELECT')]
+        self.assertEqual(len([sql for sql in writes if 'OrderModule_order"' in sql]), 1)
+        self.assertFalse([sql for sql in writes if 'OrderModule_orderitem' in sql])
+        self.assertEqual(list(order.order_items.values_list("id", "quantity")), [(item_id, 2)])
+
+    def test_item_patch_applies_only_the_diff(self):
+        second = Product.objects.create(
+            name="Second", price=50, stock=10, category=self.category, product_type="Test",
+            brand="Brand", material="Material", product_weight=5, weight=5, dimensions="1x1x1",
+            description="Second", warranty="1 year"
+        )
+        third = Product.objects.create(
+            name="Third", price=50, stock=10, category=self.category, product_type="Test",
+            brand="Brand", material="Material", product_weight=5, weight=5, dimensions="1x1x1",
+            description="Third", warranty="1 year"
+        )
+        self.client.force_authenticate(user=self.user)
+        items = [{"id": self.product.id, "quantity": 2}, {"id": second.id, "quantity": 1}]
+        self.client.post(self.api_path, self.order_payload("ORD561", items), format='json')
+        order = Order.objects.get(order_id="ORD561")
+        kept_id = order.order_items.get(product=self.product).id
+
+        items = [{"id": self.product.id, "quantity": 5}, {"id": third.id, "quantity": 1}]
+        response = self.client.patch(self.api_path + f"?id={order.id}", {"items": items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        rows = {row.product_id: row for row in order.order_items.all()}
+        self.assertEqual(set(rows), {self.product.id, third.id})
+        self.assertEqual((rows[self.product.id].id, rows[self.product.id].quantity), (kept_id, 5))
+        stock = dict(Product.objects.values_list("id", "stock"))
+        self.assertEqual((stock[self.product.id], stock[second.id], stock[third.id]), (5, 10, 9))
+
+    def create_order_with_items(self, order_id, products):
+        order = Order.objects.create(
+            order_id=order_id, order_date=timezone.now(), customer=self.user, carrier="UPS",
+            estimated_delivery_date=timezone.now() + timedelta(days=5), method="standard",
+            code=1, subtotal=100, shipping=10, tax=5, total=115
+        )
+        OrderItem.objects.bulk_create([OrderItem(order=order, product=product) for product in products])
+        return order
+
+    def test_order_list_query_count_is_constant(self):
+        products = [self.product] + [
+            Product.objects.create(
+                name=f"Item {index}", price=10, stock=10, category=self.category, product_type="Test",
+                brand="Brand", material="Material", product_weight=5, weight=5, dimensions="1x1x1",
+                description="Item", warranty="1 year"
+            )
+            for index in range(3)
+        ]
+        self.client.force_authenticate(user=self.staff)
+        self.create_order_with_items("ORD700", products[:2])
+        with self.assertNumQueries(2):
+            response = self.client.get(self.api_path)
+        self.assertEqual(len(response.data[0]["items"]), 2)
+
+        for index in range(5):
+            self.create_order_with_items(f"ORD70{index + 1}", products)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.api_path)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual({item["name"] for item in response.data[-1]["items"]}, {p.name for p in products})
+
+    def test_order_list_pagination(self):
+        for index in range(3):
+            self.create_order_with_items(f"ORD80{index}", [self.product])
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(self.api_path + "?page_size=2")
+        self.assertEqual([order["order_id"] for order in response.data["results"]], ["ORD802", "ORD801"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([order["order_id"] for order in response.data["results"]], ["ORD800"])
+        self.assertIsNone(response.data["next"])
+
+
+class DailyRevenueTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(username="revenuestaff", password="pass123", is_staff=True)
+
+    def create_order(self, order_id, total, order_status="paid"):
+        return Order.objects.create(
+            order_id=order_id, order_date=timezone.now(), order_status=order_status, customer=self.staff,
+            carrier="UPS", estimated_delivery_date=timezone.now(), method="standard", code=1,
+            subtotal=total, shipping=0, tax=0, total=total
+        )
+
+    def buckets(self):
+        return {
+            row.order_status: (row.order_count, row.total)
+            for row in DailyRevenue.objects.filter(order_count__gt=0)
+        }
+
+    def test_rollup_follows_order_changes(self):
+        first = self.create_order("REV1", 100)
+        self.create_order("REV2", 50)
+        self.assertEqual(self.buckets(), {"paid": (2, 150)})
+
+        first.order_status = "cancelled"
+        first.save()
+        self.assertEqual(self.buckets(), {"paid": (1, 50), "cancelled": (1, 100)})
+
+        Order.objects.get(order_id="REV2").delete()
+        self.assertEqual(self.buckets(), {"cancelled": (1, 100)})
+
+    def test_backfill_matches_incremental_rollup(self):
+        self.create_order("REV3", 30)
+        self.create_order("REV4", 20, order_status="shipped")
+        expected = self.buckets()
+        DailyRevenue.objects.all().delete()
+        call_command("backfill_revenue", stdout=StringIO())
+        self.assertEqual(self.buckets(), expected)
+
+    def test_last_months_profit_uses_calendar_months(self):
+        self.create_order("REV5", 80)
+        old = self.create_order("REV6", 500)
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=200))
+        call_command("backfill_revenue", stdout=StringIO())
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get("/api/orders/?get_last_months_profit=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["last_months_profit"], 80)
+        response = self.client.get("/api/orders/?get_last_months_profit=12")
+        self.assertEqual(response.data["last_months_profit"], 580)
+
+    def test_months_ago_clamps_to_month_end(self):
+        self.assertEqual(months_ago(date(2026, 3, 31), 1), date(2026, 2, 28))
+        self.assertEqual(months_ago(date(2026, 1, 15), 3), date(2025, 10, 15))
+
+
+class CustomerStatsTest(TestCase):
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username="buyer", password="pass123")
+
+    def create_order(self, order_id, total, days_ago=0, order_status="paid"):
+        day = timezone.now() - timedelta(days=days_ago)
+        return Order.objects.create(
+            order_id=order_id, order_date=day, order_status=order_status, customer=self.customer,
+            carrier="UPS", estimated_delivery_date=day, method="standard", code=1,
+            subtotal=total, shipping=0, tax=0, total=total
+        )
+
+    def stats(self):
+        user = User.objects.get(pk=self.customer.pk)
+        return (
+            user.total_orders, user.total_spent, user.average_order_value,
+            user.first_purchase_date, user.last_purchase_date,
+        )
+
+    def test_stats_follow_order_lifecycle(self):
+        today = timezone.localdate()
+        self.create_order("CS1", 100, days_ago=10)
+        pending = self.create_order("CS2", 60, order_status="pending_payment")
+        self.assertEqual(self.stats(), (1, 100, 100.0, today - timedelta(days=10), today - timedelta(days=10)))
+
+        pending.order_status = "paid"
+        pending.save()
+        self.assertEqual(self.stats(), (2, 160, 80.0, today - timedelta(days=10), today))
+
+        pending.order_status = "cancelled"
+        pending.save()
+        self.assertEqual(self.stats()[:2], (1, 100))
+        self.assertEqual(self.stats()[4], today - timedelta(days=10))
+
+        Order.objects.get(order_id="CS1").delete()
+        self.assertEqual(self.stats(), (0, 0, None, None, None))
+
+    def test_recompute_command_matches_incremental_stats(self):
+        self.create_order("CS3", 40, days_ago=3)
+        self.create_order("CS4", 25.5, days_ago=1)
+        self.create_order("CS5", 999, order_status="cancelled")
+        expected = self.stats()
+        User.objects.filter(pk=self.customer.pk).update(total_orders=None, total_spent=None)
+        call_command("recompute_customer_stats", "--chunk-size", "1", stdout=StringIO())
+        self.assertEqual(self.stats(), expected)
+
+
+class DiscountCodeValidationTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="shopper", password="pass123")
+        self.client.force_authenticate(user=self.user)
+        DiscountCode.objects.create(code="FLASH50", percentage=50)
+        DiscountCode.objects.create(code="OLD10", percentage=10, expire_date=timezone.now() - timedelta(days=1))
+
+    def test_validate_active_code(self):
+        response = self.client.get("/api/orders/?validate_discount_code=FLASH50")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["code"], "FLASH50")
+
+    def test_expired_and_unknown_codes_are_rejected(self):
+        for code in ("OLD10", "NOPE"):
+            response = self.client.get(f"/api/orders/?validate_discount_code={code}")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lookups_are_served_from_memory(self):
+        get_active_discount("FLASH50")
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(get_active_discount("FLASH50"))
+            self.assertIsNone(get_active_discount("NOPE"))
+
+    def test_writes_invalidate_the_cache(self):
+        get_active_discount("FLASH50")
+        DiscountCode.objects.create(code="NEW20", percentage=20)
+        self.assertIsNotNone(get_active_discount("NEW20"))
+        DiscountCode.objects.filter(code="FLASH50").get().delete()
+        self.assertIsNone(get_active_discount("FLASH50"))
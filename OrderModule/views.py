@@ -4,11 +4,24 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Sum
-from datetime import timedelta
+from django.db.models import Prefetch
 
-from .models import Order, DiscountCode
+from .models import Order, OrderItem, DiscountCode
 from .serializers import OrderSerializer, CreateOrderSerializer, DiscountCodeSerializer
+from .pagination import OrderCursorPagination
+from .revenue import months_ago, revenue_since
+from .discounts import get_active_discount
+
+
+def with_order_items(orders):
+    """Load the items of every order, with the product columns OrderItemSerializer reads, in one extra query."""
+    return orders.prefetch_related(Prefetch(
+        'order_items',
+        queryset=OrderItem.objects.select_related('product').only(
+            'id', 'order_id', 'quantity', 'product__id', 'product__name', 'product__price'
+        ),
+    ))
+
 
 class OrderDiscountAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -22,18 +35,25 @@ class OrderDiscountAPIView(APIView):
                 return Response({"detail": "Only staff can access profit data"}, status=status.HTTP_403_FORBIDDEN)
             try:
                 num_months = int(get_last_months_profit)
-                from_date = timezone.now() - timedelta(days=num_months * 30)
-                orders = Order.objects.filter(created_at__gte=from_date)
-                total_profit = orders.aggregate(total_sum=Sum('total'))['total_sum'] or 0
+                from_date = months_ago(timezone.localdate(), num_months)
+                total_profit = revenue_since(from_date)
                 return Response({'last_months_profit': total_profit}, status=status.HTTP_200_OK)
             except ValueError:
                 return Response({'error': 'Invalid number for get_last_months_profit'}, status=status.HTTP_400_BAD_REQUEST)
 
         discount_code = request.query_params.get('discount_code')
         discount_code_id = request.query_params.get('discount_code_id')
+        validate_discount_code = request.query_params.get('validate_discount_code')
         order_id = request.query_params.get('id')
         user_id = request.query_params.get('user_id')
 
+        if validate_discount_code is not None:
+            discount = get_active_discount(validate_discount_code)
+            if discount is None:
+                return Response({'error': 'Invalid or expired discount code'}, status=status.HTTP_404_NOT_FOUND)
+            serializer = DiscountCodeSerializer(discount)
+            return Response(serializer.data)
+
         if discount_code == 'true':
             if not user.is_staff:
                 return Response({"detail": "Staff only"}, status=status.HTTP_403_FORBIDDEN)
@@ -49,17 +69,24 @@ class OrderDiscountAPIView(APIView):
             return Response(serializer.data)
 
         if order_id:
-            order = get_object_or_404(Order, id=order_id)
-            if not user.is_staff and order.customer != user:
+            order = get_object_or_404(with_order_items(Order.objects.all()), id=order_id)
+            if not user.is_staff and order.customer_id != user.id:
                 return Response({"detail": "You can only access your own orders"}, status=status.HTTP_403_FORBIDDEN)
             serializer = OrderSerializer(order)
             return Response(serializer.data)
 
-        orders = Order.objects.all()
+        orders = with_order_items(Order.objects.all())
         if not user.is_staff:
             orders = orders.filter(customer=user)
         elif user_id:
             orders = orders.filter(customer_id=user_id)
+
+        if OrderCursorPagination.requested(request):
+            paginator = OrderCursorPagination()
+            page = paginator.paginate_queryset(orders, request, view=self)
+            serializer = OrderSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product
+from .models import Category, Product, RelatedProductList
 from mptt.admin import DraggableMPTTAdmin
 
 @admin.register(Category)
@@ -16,4 +16,10 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'created_at', 'updated_at')
     list_filter = ('category', 'created_at', 'updated_at')
     search_fields = ('name', 'description')
-    ordering = ('name',)
\ No newline at end of file
+    ordering = ('name',)
+
+
+@admin.register(RelatedProductList)
+class RelatedProductListAdmin(admin.ModelAdmin):
+    list_display = ('product_id', 'built_at')
+    readonly_fields = ('product', 'fingerprint', 'related', 'built_at')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProductmoduleConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ProductModule'
+
+    def ready(self):
+        from . import signals  # noqa: F401
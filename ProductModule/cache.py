@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from AllMaxSportWebApp.response_cache import get_generations
+
+
+def get_tree_version():
+    # Every category write bumps the response cache's 'category' generation,
+    # so it doubles as the version of the rendered trees.
+    return get_generations(['category'])[0]
+
+
+def get_cached_tree(variant, builder):
+    """Return the rendered tree stored for `variant`, building it on a miss."""
+    key = f'category_tree:{variant}'
+    version = get_tree_version()
+    data = cache.get(key, version=version)
+    if data is None:
+        data = builder()
+        cache.set(key, data, timeout=settings.CATEGORY_TREE_CACHE_TIMEOUT, version=version)
+    return data
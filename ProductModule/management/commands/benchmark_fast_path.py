@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from AllMaxSportWebApp.renderers import FastJSONRenderer
+from ProductModule.models import Product, Category
+from ProductModule.serializers import ProductSerializer
+from ProductModule.views import product_values, product_rows
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializer + JSONRenderer against values() rows + FastJSONRenderer "
+        "for the product list. Test rows are created inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['rows'])
+                self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        category = Category.objects.create(name='benchmark-fast-path')
+        Product.objects.bulk_create(
+            Product(
+                name=f'Benchmark product {index}', price=100 + index, sale_price=90 + index, stock=5,
+                category=category, product_type='Benchmark', brand='Bench', material='Steel',
+                product_weight=10, weight=10, dimensions='1x1x1', description='Benchmark row ' * 20,
+                warranty='1 year', features=['a', 'b'], images=[f'{index}.jpg'],
+            )
+            for index in range(count)
+        )
+
+    def run(self, count, repeat):
+        products = Product.objects.select_related('category')
+        fields = ProductSerializer().fields
+
+        def serializer_path():
+            return JSONRenderer().render(ProductSerializer(products, many=True).data)
+
+        def fast_path():
+            return FastJSONRenderer().render(product_rows(product_values(products, list(fields)), fields))
+
+        for label, path in (('serializer + JSONRenderer', serializer_path), ('values + FastJSONRenderer', fast_path)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                path()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            total = products.count()
+            self.stdout.write(f"{label:<28} {best * 1000:8.1f} ms  {total / best:10.0f} rows/s")
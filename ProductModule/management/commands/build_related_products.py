@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from AllMaxSportWebApp.response_cache import bump_generation
+from ProductModule.related import build_related
+
+
+class Command(BaseCommand):
+    help = "Refresh the precomputed related-products lists of products whose category, brand or orders changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rescore every product instead of only the changed ones.")
+
+    def handle(self, *args, **options):
+        written, deleted = build_related(full=options['full'])
+        if written or deleted:
+            bump_generation('product')
+        self.stdout.write(self.style.SUCCESS(f"Updated {written} and removed {deleted} related-product list(s)."))
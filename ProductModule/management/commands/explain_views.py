@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from UserModule.models import User
+
+# (view, query params) pairs mirroring the filter combinations the
+# storefront and the staff panel actually send.
+PROBES = [
+    ('ProductModule.views.ProductCategoryAPIView', {}),
+    ('ProductModule.views.ProductCategoryAPIView', {'status': 'active', 'min_price': '1', 'max_price': '1000'}),
+    ('ProductModule.views.ProductCategoryAPIView', {'min_sale_price': '1', 'max_sale_price': '1000'}),
+    ('ProductModule.views.ProductCategoryAPIView', {'sales': '0'}),
+    ('ProductModule.views.ProductCategoryAPIView', {'page_size': '20'}),
+    ('ProductModule.views.ProductCategoryAPIView', {'page_size': '20', 'ordering': 'price'}),
+    ('ProductModule.views.ProductCategoryAPIView', {'q': 'bike'}),
+    ('ProductModule.views.CategoryAPIView', {}),
+    ('BlogModule.views.BlogAPIView', {'status': 'published'}),
+    ('BlogModule.views.BlogAPIView', {'status': 'published', 'seo_score': '80'}),
+    ('BlogModule.views.BlogAPIView', {'status': 'published', 'q': 'protein'}),
+    ('OrderModule.views.OrderDiscountAPIView', {'user_id': '1'}),
+    ('OrderModule.views.OrderDiscountAPIView', {'get_last_months_profit': '3'}),
+    ('TicketModul.views.TicketAPIView', {'status': 'open', 'priority': 'high'}),
+    ('TicketModul.views.TicketAPIView', {'related_order_id': 'ORD1'}),
+]
+
+
+class Command(BaseCommand):
+    help = "Run the query plan of every query issued by the main list views and report full table scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help="Exit with an error when any full table scan is found."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f"Query plans are not supported for the '{connection.vendor}' backend.")
+
+        # Pagination builds absolute links, so the probe needs a host the
+        # current settings accept.
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')),
+            'localhost'
+        )
+        factory = APIRequestFactory()
+        staff = User(username='explain_views', is_staff=True, is_superuser=True)
+        scans = 0
+
+        for view_path, params in PROBES:
+            request = factory.get('/', params, HTTP_HOST=host)
+            force_authenticate(request, user=staff)
+            view = import_string(view_path).as_view()
+
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    view(request)
+                transaction.set_rollback(True)
+
+            label = f"{view_path.rsplit('.', 1)[-1]} {params or ''}".rstrip()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                full_scans = self.full_scans(sql)
+                scans += len(full_scans)
+                style = self.style.WARNING if full_scans else self.style.SUCCESS
+                self.stdout.write(style(f"  {'SCAN' if full_scans else 'ok  '} {sql[:160]}"))
+                for line in full_scans:
+                    self.stdout.write(f"       {line}")
+
+        summary = f"{scans} full table scan(s) found."
+        if scans and options['fail_on_scan']:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = [row[-1] for row in cursor.fetchall()]
+                return [
+                    line for line in plan
+                    if line.startswith('SCAN') and 'INDEX' not in line and 'VIRTUAL TABLE' not in line
+                ]
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0].strip() for row in cursor.fetchall() if 'Seq Scan' in row[0]]
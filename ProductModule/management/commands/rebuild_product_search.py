@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from AllMaxSportWebApp.response_cache import bump_generation
+from ProductModule.models import Product
+from ProductModule.search import index_products, product_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the Product table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not product_index.supported:
+            raise CommandError("The configured database backend has no product search index.")
+        with transaction.atomic():
+            total = product_index.rebuild(Product.objects.all(), index_products, chunk_size=options['chunk_size'])
+            bump_generation('product')
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products."))
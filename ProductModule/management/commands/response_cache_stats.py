@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from AllMaxSportWebApp.response_cache import get_stats
+
+SCOPES = ('products', 'categories', 'blogs')
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the anonymous GET response cache."
+
+    def handle(self, *args, **options):
+        for scope in SCOPES:
+            stats = get_stats(scope)
+            total = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / total if total else 0
+            self.stdout.write(f"{scope:<12} hits={stats['hits']:<8} misses={stats['misses']:<8} hit ratio={ratio:.1%}")
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE product_search USING fts5(
+        name, brand, category, product_type, description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO product_search (rowid, name, brand, category, product_type, description)
+    SELECT p.id, p.name, p.brand, c.name, p.product_type, p.description
+    FROM "ProductModule_product" p JOIN "ProductModule_category" c ON c.id = p.category_id
+    """,
+]
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE product_search (
+        product_id bigint PRIMARY KEY,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX product_search_document_idx ON product_search USING GIN (document)",
+    """
+    INSERT INTO product_search (product_id, document)
+    SELECT p.id,
+        setweight(to_tsvector('simple', p.name), 'A')
+        || setweight(to_tsvector('simple', p.brand), 'B')
+        || setweight(to_tsvector('simple', c.name), 'B')
+        || setweight(to_tsvector('simple', p.product_type), 'C')
+        || setweight(to_tsvector('simple', p.description), 'D')
+    FROM "ProductModule_product" p JOIN "ProductModule_category" c ON c.id = p.category_id
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_CREATE,
+        'postgresql': POSTGRES_CREATE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProductModule', '0010_category_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
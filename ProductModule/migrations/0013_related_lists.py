@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ProductModule', '0012_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProductList',
+            fields=[
+                ('product', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='ProductModule.product')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('related', models.JSONField(default=list, help_text='[[product id, score], ...]')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest, Now
 from mptt.models import MPTTModel, TreeForeignKey
 
+from AllMaxSportWebApp.response_cache import bump_generation
+
 STATUS_CHOICES = [
     ('active', 'Active'),
     ('inactive', 'Inactive'),
@@ -23,6 +27,59 @@ class Category(MPTTModel):
 
 
 
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for product id(s): {', '.join(map(str, product_ids))}")
+
+
+class ProductQuerySet(models.QuerySet):
+
+    @staticmethod
+    def _per_product(quantities):
+        return Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+            output_field=models.IntegerField(),
+        )
+
+    def reserve_stock(self, quantities):
+        """
+        Take {product_id: quantity} out of stock and add it to sales with a
+        single conditional UPDATE, so concurrent checkouts never need row
+        locks. If any product is short, nothing is changed and
+        InsufficientStock is raised.
+        """
+        if not quantities:
+            return
+        amount = self._per_product(quantities)
+        with transaction.atomic():
+            updated = self.filter(id__in=list(quantities), stock__gte=amount).update(
+                stock=F('stock') - amount,
+                sales=F('sales') + amount,
+                updated_at=Now(),
+            )
+            if updated != len(quantities):
+                raise InsufficientStock(sorted(
+                    product_id for product_id, stock in
+                    self.filter(id__in=list(quantities)).values_list('id', 'stock')
+                    if stock < quantities[product_id]
+                ) or sorted(quantities))
+        # Queryset updates send no signals.
+        bump_generation('product')
+
+    def release_stock(self, quantities):
+        """Return {product_id: quantity} to stock, e.g. when an order is cancelled."""
+        if not quantities:
+            return
+        amount = self._per_product(quantities)
+        self.filter(id__in=list(quantities)).update(
+            stock=F('stock') + amount,
+            sales=Greatest(F('sales') - amount, Value(0)),
+            updated_at=Now(),
+        )
+        bump_generation('product')
+
+
 class Product(models.Model):
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=12, decimal_places=2)
@@ -47,5 +104,30 @@ class Product(models.Model):
     features = models.JSONField(default=list)
     images = models.JSONField(default=list)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['status', 'price'], name='product_status_price_idx'),
+            models.Index(fields=['sale_price'], name='product_sale_price_idx'),
+            models.Index(fields=['sales'], name='product_sales_idx'),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class RelatedProductList(models.Model):
+    """Precomputed related products of a product, best first; built by ProductModule.related."""
+    # No constraint: a deleted product's list stays until the next build removes it.
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name='+'
+    )
+    fingerprint = models.CharField(max_length=64)
+    related = models.JSONField(default=list, help_text="[[product id, score], ...]")
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Related products of product {self.product_id}"
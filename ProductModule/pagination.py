@@ -0,0 +1,25 @@
+from rest_framework.pagination import PageNumberPagination
+
+from AllMaxSportWebApp.pagination import KeysetPagination
+
+
+class ProductCursorPagination(KeysetPagination):
+    ordering_choices = {
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+    }
+    ordering = ordering_choices['-created_at']
+
+
+class ProductSearchPagination(PageNumberPagination):
+    """Pages over ranked results (q=, related=) by position, so rank order is kept."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return cls.page_query_param in params or cls.page_size_query_param in params
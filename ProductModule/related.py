@@ -0,0 +1,48 @@
+"""
+Related products: active products scored by being bought in the same
+orders, a shared category and a shared brand (see
+AllMaxSportWebApp.similarity).
+"""
+from collections import defaultdict
+
+from AllMaxSportWebApp.similarity import combine, fingerprint, flags, related_ids, sync_related
+from OrderModule.models import OrderItem
+from .models import Product, RelatedProductList
+
+WEIGHTS = {'orders': 0.5, 'category': 0.3, 'brand': 0.2}
+# Orders that never went through do not count as buying together.
+PURCHASE_STATUSES = ('paid', 'shipped', 'delivered')
+RELATED_LIMIT = 8
+MIN_SCORE = 0.05
+
+
+def product_features():
+    """({product id: vector}, {product id: fingerprint}) for every active product."""
+    orders = defaultdict(list)
+    for product_id, order_id in (
+        OrderItem.objects.filter(product__status='active', order__order_status__in=PURCHASE_STATUSES)
+        .order_by('order_id').values_list('product_id', 'order_id')
+    ):
+        orders[product_id].append(order_id)
+
+    vectors, fingerprints = {}, {}
+    rows = Product.objects.filter(status='active').order_by('id').values_list('id', 'category_id', 'brand')
+    for product_id, category_id, brand in rows:
+        brand = brand.strip().lower() or None
+        vectors[product_id] = combine({
+            'orders': flags(orders[product_id]),
+            'category': flags([category_id]),
+            'brand': flags([brand]),
+        }, WEIGHTS)
+        fingerprints[product_id] = fingerprint(category_id, brand, orders[product_id])
+    return vectors, fingerprints
+
+
+def build_related(full=False):
+    """Refresh RelatedProductList; returns (lists written, lists deleted)."""
+    vectors, fingerprints = product_features()
+    return sync_related(RelatedProductList, vectors, fingerprints, RELATED_LIMIT, MIN_SCORE, full=full)
+
+
+def related_product_ids(product_id):
+    return related_ids(RelatedProductList, product_id)
@@ -0,0 +1,40 @@
+from AllMaxSportWebApp.search import SearchIndex
+from .models import Product
+
+SEARCH_MAX_RESULTS = 500
+
+INDEXED_FIELDS = ('id', 'name', 'brand', 'category__name', 'product_type', 'description')
+
+product_index = SearchIndex(
+    'product_search',
+    (
+        ('name', 10.0, 'A'),
+        ('brand', 5.0, 'B'),
+        ('category', 3.0, 'B'),
+        ('product_type', 2.0, 'C'),
+        ('description', 1.0, 'D'),
+    ),
+    pk_column='product_id',
+)
+
+
+def index_products(products):
+    """Write the search documents for a Product queryset."""
+    rows = products.order_by().values_list(*INDEXED_FIELDS)
+    product_index.replace((row[0], row[1:]) for row in rows)
+
+
+def index_product(product):
+    product_index.replace([(product.id, [
+        product.name, product.brand, product.category.name,
+        product.product_type, product.description,
+    ])])
+
+
+def remove_products(product_ids):
+    product_index.delete(product_ids)
+
+
+def search_product_ids(query):
+    """Ranked product ids for `query`, or None when the backend has no index."""
+    return product_index.search(query, SEARCH_MAX_RESULTS)
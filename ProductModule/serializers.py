@@ -8,10 +8,7 @@ class RecursiveCategorySerializer(serializers.Serializer):
     childs = serializers.SerializerMethodField()
 
     def get_childs(self, obj):
-        children = obj.get_children()
-        if children.exists():
-            return RecursiveCategorySerializer(children, many=True).data
-        return []
+        return RecursiveCategorySerializer(obj.get_children(), many=True).data
     
 
 
@@ -29,10 +26,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description','image', 'parent', 'childs']
 
     def get_childs(self, obj):
-        children = obj.get_children()
-        if children.exists():
-            return CategorySerializer(children, many=True).data
-        return []
+        return CategorySerializer(obj.get_children(), many=True).data
 
     def validate_parent(self, value):
         """Prevent adding a child under another child (max depth = 2)"""
@@ -60,6 +54,15 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = '__all__'
 
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        """`fields` / `exclude` trim the output to a sparse fieldset."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
     def to_internal_value(self, data):
         if 'category' in data and isinstance(data['category'], dict):
             data['category'] = data['category'].get('name', None)
@@ -78,3 +81,20 @@ class ProductSerializer(serializers.ModelSerializer):
             category_obj, _ = Category.objects.get_or_create(name=category_name)
             validated_data['category'] = category_obj
         return super().update(instance, validated_data)
+
+
+
+class ProductCardSerializer(serializers.ModelSerializer):
+    """Compact product for grid views: no description, specs or image gallery."""
+    category = serializers.CharField(source='category.name')
+    image = serializers.SerializerMethodField()
+
+    # Columns the card reads, for QuerySet.only().
+    columns = ('id', 'name', 'price', 'sale_price', 'brand', 'status', 'stock', 'images', 'category__name')
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price', 'sale_price', 'brand', 'category', 'status', 'stock', 'image']
+
+    def get_image(self, obj):
+        return obj.images[0] if obj.images else None
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from AllMaxSportWebApp.response_cache import bump_generation
+
+from .models import Category, Product
+from .search import index_product, index_products, remove_products
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    # Product documents carry the category name.
+    if not created:
+        index_products(Product.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, **kwargs):
+    index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    bump_generation('product')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+def category_changed(sender, **kwargs):
+    bump_generation('category')
@@ -1,9 +1,26 @@
+import json
+import subprocess
+import sys
+import threading
+from base64 import b64encode
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Product, Category
+from AllMaxSportWebApp import renderers, response_cache, similarity
+from .models import Product, Category, RelatedProductList
 from .serializers import ProductSerializer
+from .search import product_index
+from OrderModule.models import Order, OrderItem
 from django.contrib.auth import get_user_model
 
 class ProductAPITest(TestCase):
@@ -118,3 +135,528 @@ class ProductAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['name'], "Fitness")
+
+    def test_cursor_pagination_walks_all_pages(self):
+        for index in range(4):
+            Product.objects.create(
+                name=f"Bike {index}", price=100 + index, stock=1, category=self.category,
+                product_type="Cardio", brand="FitBrand", material="Steel", product_weight=20,
+                weight=20, dimensions="1x1x1", description="Bike", warranty="1 year"
+            )
+
+        url = reverse("product-category-api") + "?page_size=2&ordering=price"
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            names.extend(item['name'] for item in response.data['results'])
+            last_page = response.data
+            url = response.data['next']
+
+        self.assertEqual(names, ["Bike 0", "Bike 1", "Bike 2", "Bike 3", "Treadmill"])
+        response = self.client.get(last_page['previous'])
+        self.assertEqual([item['name'] for item in response.data['results']], ["Bike 2", "Bike 3"])
+
+    def test_cursor_pagination_keeps_filters(self):
+        response = self.client.get(reverse("product-category-api") + "?page_size=10&brand=Other")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("product-category-api") + "?cursor=bogus")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Decodes fine, but the values do not fit the ordering fields.
+        for ordering, position in (("price", ["abc", "1"]), ("-created_at", ["yesterday", "1"])):
+            cursor = b64encode(json.dumps({"r": 0, "p": position}).encode()).decode()
+            response = self.client.get(
+                reverse("product-category-api"), {"cursor": cursor, "ordering": ordering}
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CategoryTreeQueryTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for root_index in range(3):
+            root = Category.objects.create(name=f"Root {root_index}")
+            for child_index in range(2):
+                Category.objects.create(name=f"Child {root_index}.{child_index}", parent=root)
+
+    def test_category_tree_is_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("category-api"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(
+            [child['name'] for child in response.data[0]['childs']],
+            ["Child 0.0", "Child 0.1"]
+        )
+        self.assertEqual(response.data[0]['childs'][0]['childs'], [])
+
+    def test_show_categories_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("product-category-api") + "?show_categories=true")
+        self.assertEqual(len(response.data), 9)
+
+        Category.objects.create(name="Child 0.2", parent=Category.objects.get(name="Root 0"))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("product-category-api") + "?show_categories=true")
+        self.assertEqual(len(response.data), 10)
+
+    def test_single_category_subtree(self):
+        root = Category.objects.get(name="Root 1")
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("category-api") + f"?id={root.id}")
+        self.assertEqual(response.data['name'], "Root 1")
+        self.assertEqual(len(response.data['childs']), 2)
+
+    def test_category_tree_is_served_from_cache(self):
+        self.client.get(reverse("category-api"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("category-api"))
+        self.assertEqual(len(response.data), 3)
+
+    def test_category_change_invalidates_cached_tree(self):
+        self.client.get(reverse("category-api"))
+        self.client.get(reverse("product-category-api") + "?show_categories=true")
+
+        Category.objects.create(name="Root 3")
+        response = self.client.get(reverse("category-api"))
+        self.assertEqual(len(response.data), 4)
+        response = self.client.get(reverse("product-category-api") + "?show_categories=true")
+        self.assertEqual(len(response.data), 10)
+
+        Category.objects.get(name="Child 1.0").delete()
+        response = self.client.get(reverse("category-api"))
+        self.assertEqual(len(response.data[1]['childs']), 1)
+
+
+class ProductSearchTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Cardio")
+        self.treadmill = self.create_product("Pro Treadmill", "RunFast", "Folding treadmill")
+        self.bike = self.create_product("Spin Bike", "RunFast", "Quiet bike, pairs well with a treadmill mat")
+
+    def create_product(self, name, brand, description):
+        return Product.objects.create(
+            name=name, price=100, stock=1, category=self.category, product_type="Machine",
+            brand=brand, material="Steel", product_weight=20, weight=20, dimensions="1x1x1",
+            description=description, warranty="1 year"
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse("product-category-api"), {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data]
+
+    def test_search_ranks_name_matches_first(self):
+        self.assertEqual(self.search("treadmill"), ["Pro Treadmill", "Spin Bike"])
+
+    def test_search_matches_prefixes_of_every_word(self):
+        self.assertEqual(self.search("runf spi"), ["Spin Bike"])
+        self.assertEqual(self.search("nothing"), [])
+
+    def test_paged_search_keeps_rank_order(self):
+        url = reverse("product-category-api")
+        response = self.client.get(url, {"q": "treadmill", "page_size": 1})
+        self.assertEqual([item['name'] for item in response.data['results']], ["Pro Treadmill"])
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['name'] for item in response.data['results']], ["Spin Bike"])
+        self.assertIsNone(response.data['next'])
+
+    def test_index_follows_product_and_category_changes(self):
+        self.bike.name = "Air Bike"
+        self.bike.save()
+        self.assertEqual(self.search("air"), ["Air Bike"])
+
+        self.category.name = "Endurance"
+        self.category.save()
+        self.assertEqual(len(self.search("endurance")), 2)
+
+        self.treadmill.delete()
+        self.assertEqual(self.search("treadmill"), ["Air Bike"])
+
+    def test_rebuild_command(self):
+        product_index.delete_all()
+        self.assertEqual(self.search("bike"), [])
+        call_command("rebuild_product_search", stdout=StringIO())
+        self.assertEqual(self.search("bike"), ["Spin Bike"])
+
+
+class ExplainViewsCommandTest(TestCase):
+
+    def test_filtered_product_queries_use_indexes(self):
+        out = StringIO()
+        call_command("explain_views", stdout=out)
+        report = out.getvalue()
+        self.assertIn("full table scan(s) found.", report)
+        section = report.split("{'status': 'active', 'min_price': '1', 'max_price': '1000'}")[1]
+        self.assertTrue(section.split("\n")[1].lstrip().startswith("ok"))
+
+
+class ProductProjectionTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name="Strength")
+        for index in range(3):
+            Product.objects.create(
+                name=f"Rack {index}", price=300, stock=2, category=category, product_type="Rack",
+                brand="IronCo", material="Steel", product_weight=90, weight=90, dimensions="2x1x2",
+                description="Long description " * 50, warranty="5 years",
+                features=["safety arms"], images=[f"rack{index}.jpg", "detail.jpg"]
+            )
+
+    def test_card_view(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("product-category-api") + "?view=card")
+        # One aggregate for the ETag, one for the rows.
+        self.assertEqual(len(captured), 2)
+        self.assertNotIn('"description"', captured[1]['sql'])
+        self.assertEqual(
+            set(response.data[0]),
+            {'id', 'name', 'price', 'sale_price', 'brand', 'category', 'status', 'stock', 'image'}
+        )
+        self.assertEqual(response.data[0]['category'], "Strength")
+        self.assertEqual(response.data[0]['image'], "rack0.jpg")
+
+    def test_fields_and_exclude(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("product-category-api") + "?fields=id,name,category")
+        self.assertEqual(len(captured), 2)
+        self.assertNotIn('"features"', captured[1]['sql'])
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'category'})
+        self.assertEqual(response.data[0]['category'], "Strength")
+
+        response = self.client.get(reverse("product-category-api") + "?exclude=description,features")
+        self.assertNotIn('description', response.data[0])
+        self.assertIn('images', response.data[0])
+
+    def test_fields_without_category(self):
+        for query in ("?fields=id,name,price", "?exclude=category", "?fields=id,name&fast=true"):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse("product-category-api") + query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('category', response.data[0])
+            self.assertNotIn('ProductModule_category', captured[1]['sql'])
+
+    def test_card_view_with_pagination(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("product-category-api") + "?view=card&page_size=2")
+        self.assertEqual(len(captured), 2)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class FastPathTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name="Cardio")
+        for index in range(3):
+            Product.objects.create(
+                name=f"Bike {index}", price="499.90", sale_price="450.00", stock=4, category=category,
+                product_type="Bike", brand="SpinCo", material="Alloy", product_weight=30, weight=30,
+                dimensions="1x1x1", description="Spin bike", warranty="2 years",
+                features=["display"], images=[f"bike{index}.jpg"]
+            )
+
+    def test_fast_rows_match_serializer(self):
+        slow = self.client.get(reverse("product-category-api")).json()
+        with self.assertNumQueries(2):
+            fast = self.client.get(reverse("product-category-api") + "?fast=true").json()
+        self.assertEqual(len(fast), 3)
+        self.assertEqual(fast, slow)
+
+        url = reverse("product-category-api") + "?fields=id,weight,product_weight"
+        self.assertEqual(self.client.get(url + "&fast=true").json(), self.client.get(url).json())
+
+    def test_fast_card_view_with_pagination(self):
+        response = self.client.get(reverse("product-category-api") + "?fast=true&view=card&page_size=2")
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(data['results'][0]['image'], "bike2.jpg")
+        self.assertEqual(data['results'][0]['category'], "Cardio")
+        next_page = self.client.get(data['next']).json()
+        self.assertEqual([row['name'] for row in next_page['results']], ["Bike 0"])
+
+    def test_renderer_stdlib_fallback_matches(self):
+        product = Product.objects.first()
+        row = {'price': product.price, 'created_at': product.created_at, 'text': "a\u2028b"}
+        fast = renderers.FastJSONRenderer().render(row)
+        original = renderers.orjson
+        renderers.orjson = None
+        try:
+            fallback = renderers.FastJSONRenderer().render(row)
+        finally:
+            renderers.orjson = original
+        self.assertEqual(fast, fallback)
+        self.assertIn(b'"price":"499.90"', fast)
+        self.assertIn(b"\\u2028", fast)
+
+
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Yoga")
+        self.product = Product.objects.create(
+            name="Mat", price=30, stock=10, category=self.category, product_type="Mat", brand="Flex",
+            material="Rubber", product_weight=1, weight=1, dimensions="1x1", description="Mat",
+            warranty="1 year", features=[], images=[]
+        )
+        self.url = reverse("product-category-api")
+
+    def test_product_list_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertNotIn("Last-Modified", response)
+        # Authenticated requests bypass the response cache: one aggregate.
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="buyer", password="pw"))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.force_authenticate(user=None)
+
+        self.product.price = 25
+        self.product.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_product_etag_tracks_stock_and_categories(self):
+        etag = self.client.get(self.url)["ETag"]
+        Product.objects.filter(id=self.product.id).reserve_stock({self.product.id: 1})
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+        etag = self.client.get(self.url)["ETag"]
+        self.category.name = "Pilates"
+        self.category.save()
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+    def test_deleting_an_older_product_changes_the_validators(self):
+        older = Product.objects.create(
+            name="Block", price=10, stock=10, category=self.category, product_type="Block", brand="Flex",
+            material="Foam", product_weight=1, weight=1, dimensions="1x1", description="Block",
+            warranty="1 year", features=[], images=[]
+        )
+        Product.objects.filter(id=older.id).update(updated_at=timezone.now() - timedelta(days=1))
+        etag = self.client.get(self.url)["ETag"]
+        older.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product["name"] for product in response.json()], ["Mat"])
+
+    def test_keyset_pages_validate_their_own_rows(self):
+        for index in range(3):
+            Product.objects.create(
+                name=f"Strap {index}", price=5, stock=10, category=self.category, product_type="Strap",
+                brand="Flex", material="Cotton", product_weight=1, weight=1, dimensions="1x1",
+                description="Strap", warranty="1 year", features=[], images=[]
+            )
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="pager", password="pw"))
+        first = self.client.get(self.url + "?page_size=2")
+        with CaptureQueriesContext(connection) as captured:
+            second = self.client.get(first.json()["next"])
+        self.assertTrue(all("COUNT" not in query["sql"] for query in captured))
+        self.assertTrue(all("LIMIT 3" in query["sql"] for query in captured))
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(first.json()["next"], HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A change on another page leaves this one valid; one on it does not.
+        Product.objects.filter(name="Strap 2").update(price=20, updated_at=timezone.now())
+        response = self.client.get(first.json()["next"], HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Product.objects.filter(name="Strap 0").update(price=20, updated_at=timezone.now())
+        response = self.client.get(first.json()["next"], HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_product_filters_have_own_validators(self):
+        etag = self.client.get(self.url + "?brand=Flex")["ETag"]
+        self.assertNotEqual(self.client.get(self.url + "?brand=None")["ETag"], etag)
+
+    def test_category_tree_not_modified_without_queries(self):
+        etag = self.client.get(reverse("category-api"))["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("category-api"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Category.objects.create(name="Boxing")
+        response = self.client.get(reverse("category-api"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ResponseCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Rowing")
+        self.product = Product.objects.create(
+            name="Rower", price=800, stock=3, category=self.category, product_type="Rower", brand="Oar",
+            material="Steel", product_weight=35, weight=35, dimensions="2x1x1", description="Rower",
+            warranty="2 years", features=[], images=[]
+        )
+        self.url = reverse("product-category-api")
+
+    def test_anonymous_get_is_served_from_cache(self):
+        response = self.client.get(self.url, {"brand": "Oar", "status": "active"})
+        self.assertEqual(response["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            # Same parameters in another order hit the same entry.
+            cached = self.client.get(self.url + "?status=active&brand=Oar")
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.json(), response.json())
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url + "?status=active&brand=Oar", HTTP_IF_NONE_MATCH=cached["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response_cache.get_stats("products"), {"hits": 2, "misses": 1})
+
+    def test_writes_invalidate_cached_responses(self):
+        self.client.get(self.url)
+        self.product.price = 750
+        self.product.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()[0]["price"], "750.00")
+
+        Product.objects.filter(id=self.product.id).reserve_stock({self.product.id: 1})
+        self.assertEqual(self.client.get(self.url).json()[0]["stock"], 2)
+
+        self.client.get(reverse("category-api"))
+        self.category.name = "Erg"
+        self.category.save()
+        self.assertEqual(self.client.get(self.url).json()[0]["category"], "Erg")
+        self.assertEqual(self.client.get(reverse("category-api")).json()[0]["name"], "Erg")
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get(self.url)
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username="member", password="pw"))
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Cache", response)
+
+    def test_stats_are_shared_with_other_processes(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        output = subprocess.run(
+            [sys.executable, "manage.py", "response_cache_stats"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(output.split()[:3], ["products", "hits=1", "misses=1"])
+
+    def test_concurrent_miss_waits_for_rebuild(self):
+        keys = []
+        original = response_cache.response_key
+
+        def capture(*args):
+            keys.append(original(*args))
+            return keys[-1]
+
+        with mock.patch.object(response_cache, "response_key", capture):
+            self.client.get(self.url)
+        entry = cache.get(keys[0])
+        cache.delete(keys[0])
+
+        # Another worker holds the rebuild lock and stores the entry shortly.
+        cache.add(f"{keys[0]}:lock", 1)
+        timer = threading.Timer(0.2, cache.set, (keys[0], entry))
+        timer.start()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        timer.join()
+        self.assertEqual(response["X-Cache"], "HIT")
+
+        # If it never shows up, the waiter builds the response itself.
+        cache.delete(keys[0])
+        with self.settings(RESPONSE_CACHE_LOCK_WAIT=0.1):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()[0]["name"], "Rower")
+
+
+class RelatedProductsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = get_user_model().objects.create_user(username="buyer", password="pass123")
+        self.bikes = Category.objects.create(name="Bikes")
+        self.weights = Category.objects.create(name="Weights")
+        self.bike = self.make("Bike", self.bikes, "Spin")
+        self.other_bike = self.make("Other bike", self.bikes, "Pedal")
+        self.mat = self.make("Mat", self.weights, "Pedal")
+        self.dumbbell = self.make("Dumbbell", self.weights, "Iron")
+        self.url = reverse("product-category-api")
+
+    def make(self, name, category, brand):
+        return Product.objects.create(
+            name=name, price=100, stock=5, category=category, product_type=name, brand=brand,
+            material="Steel", product_weight=5, weight=5, dimensions="1x1x1", description=name,
+            warranty="1 year", features=[], images=[]
+        )
+
+    def order(self, code, products, order_status="paid"):
+        order = Order.objects.create(
+            order_id=f"ORD{code}", order_date=timezone.now(), order_status=order_status,
+            customer=self.customer, customer_name="buyer", carrier="UPS", cost=100,
+            estimated_delivery_date=timezone.now() + timedelta(days=5), method="standard",
+            code=code, subtotal=100, shipping=10, tax=5, total=115
+        )
+        for product in products:
+            OrderItem.objects.create(order=order, product=product)
+
+    def related(self, product):
+        return [item["id"] for item in self.client.get(self.url, {"related": product.id}).json()]
+
+    def test_related_products_by_purchases_category_and_brand(self):
+        self.order(1, [self.bike, self.dumbbell])
+        self.order(2, [self.bike, self.mat], order_status="cancelled")
+        call_command("build_related_products", stdout=StringIO())
+
+        self.assertEqual(self.related(self.bike), [self.dumbbell.id, self.other_bike.id])
+        self.assertEqual(self.related(self.mat), [self.dumbbell.id, self.other_bike.id])
+        self.assertEqual(self.client.get(self.url, {"related": "x"}).json(), [])
+
+    def test_incremental_rebuild(self):
+        # Both scoring paths: plain Python for the incremental runs, NumPy for the full one.
+        patch = mock.patch.object(similarity, "numpy", None)
+        patch.start()
+        self.addCleanup(patch.stop)
+        call_command("build_related_products", stdout=StringIO())
+        out = StringIO()
+        call_command("build_related_products", stdout=out)
+        self.assertIn("Updated 0 and removed 0", out.getvalue())
+
+        # Only the two bought products are rescored from scratch and rewritten.
+        self.order(3, [self.other_bike, self.dumbbell])
+        call_command("build_related_products", stdout=out)
+        self.assertIn("Updated 2 and removed 0", out.getvalue())
+        self.assertEqual(self.related(self.bike), [self.other_bike.id])
+        self.assertEqual(self.related(self.other_bike)[0], self.dumbbell.id)
+
+        self.other_bike.status = "inactive"
+        self.other_bike.save()
+        call_command("build_related_products", stdout=out)
+        self.assertIn("removed 1", out.getvalue())
+        self.assertEqual(self.related(self.bike), [])
+        self.assertEqual(self.related(self.mat), [self.dumbbell.id])
+
+        incremental = dict(RelatedProductList.objects.values_list("product_id", "related"))
+        patch.stop()
+        self.assertIsNotNone(similarity.numpy)
+        call_command("build_related_products", "--full", stdout=out)
+        self.assertEqual(dict(RelatedProductList.objects.values_list("product_id", "related")), incremental)
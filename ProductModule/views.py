@@ -1,25 +1,140 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
-from django.db.models import Q
+from rest_framework import serializers, status
+from django.db.models import Q, Case, When, Value
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from .serializers import ProductSerializer, ProductCardSerializer, CategorySerializer
+from .pagination import ProductCursorPagination, ProductSearchPagination
+from .cache import get_cached_tree, get_tree_version
+from .search import search_product_ids
+from .related import related_product_ids
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
 from django.db import IntegrityError
 from UserModule.permissions import IsStaffUser
+from AllMaxSportWebApp.renderers import FastJSONRenderer
+from AllMaxSportWebApp.response_cache import cache_anonymous_get
+from AllMaxSportWebApp.conditional import conditional_response, make_etag, page_validators, queryset_validators
+
+
+def category_nodes(categories):
+    """
+    Build CategorySerializer-shaped dicts straight from values() rows in tree
+    order, linking each node into its parent's `childs`. Returns every node.
+    """
+    nodes = {}
+    for row in categories.values('id', 'name', 'description', 'image', 'parent_id'):
+        node = {
+            'id': row['id'], 'name': row['name'], 'description': row['description'],
+            'image': row['image'], 'parent': row['parent_id'], 'childs': [],
+        }
+        nodes[row['id']] = node
+        parent = nodes.get(row['parent_id'])
+        if parent is not None:
+            parent['childs'].append(node)
+    return list(nodes.values())
+
+
+def all_categories_data():
+    return category_nodes(Category.objects.all())
+
+
+def category_roots_data():
+    return [node for node in category_nodes(Category.objects.all()) if node['parent'] is None]
+
+
+def category_subtree_data(cat_id):
+    category = Category.objects.get(id=cat_id)
+    return category_nodes(category.get_descendants(include_self=True))[0]
+
+
+def tree_validators(request, variant):
+    # The tree version changes on every category write, so it doubles as a
+    # validator without touching the database.
+    return make_etag('category_tree', variant, get_tree_version(), request.accepted_renderer.format), None
+
+
+# Always loaded so keyset pagination can build cursors without extra queries.
+KEYSET_COLUMNS = ('id', 'created_at', 'price')
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else None
+
+
+def project_products(products, params):
+    """
+    Pick the serializer for ?view=card or ?fields= / ?exclude= and push the
+    same projection down into the query, so unrequested columns (description,
+    features, images...) are never read from the database.
+    """
+    if params.get('view') == 'card':
+        products = products.select_related('category')
+        return products.only(*ProductCardSerializer.columns, *KEYSET_COLUMNS), ProductCardSerializer, {}
+
+    fields, exclude = split_param(params.get('fields')), split_param(params.get('exclude'))
+    if fields is None and exclude is None:
+        return products.select_related('category'), ProductSerializer, {}
+
+    kwargs = {'fields': fields, 'exclude': exclude}
+    model_fields = {field.name for field in Product._meta.concrete_fields}
+    columns = set(KEYSET_COLUMNS)
+    for name in ProductSerializer(**kwargs).fields:
+        if name == 'category':
+            # A deferred foreign key cannot be followed by select_related.
+            products = products.select_related('category')
+            columns.add('category__name')
+        elif name in model_fields:
+            columns.add(name)
+    return products.only(*columns), ProductSerializer, kwargs
+
+
+# values() column behind each output name that is not a plain column.
+PRODUCT_VALUE_COLUMNS = {'category': 'category__name', 'image': 'images'}
+
+
+def product_values(products, names):
+    """The fast path: fetch plain tuples for `names` instead of model instances."""
+    columns = {PRODUCT_VALUE_COLUMNS.get(name, name) for name in names} | set(KEYSET_COLUMNS)
+    return products.values(*columns)
+
+
+def product_rows(rows, fields):
+    """
+    Shape values() rows like the output of the serializer `fields`, skipping
+    field-by-field conversion; columns are emitted as stored except where the
+    serializer declares a float over another column type (weight is text,
+    product_weight an integer).
+    """
+    names = list(fields)
+    floats = [name for name in names if isinstance(fields[name], serializers.FloatField)]
+    data = []
+    for row in rows:
+        item = {name: row[PRODUCT_VALUE_COLUMNS.get(name, name)] for name in names}
+        if 'image' in item:
+            item['image'] = item['image'][0] if item['image'] else None
+        for name in floats:
+            if item[name] is not None:
+                item[name] = float(item[name])
+        data.append(item)
+    return data
+
 
 class ProductCategoryAPIView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
         return [IsStaffUser()]
 
+    @cache_anonymous_get('products', 'product', 'category')
     def get(self, request):
         if request.GET.get('show_categories') == 'true':
-            categories = Category.objects.all()
-            serializer = CategorySerializer(categories, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional_response(
+                request, tree_validators(request, 'all'),
+                lambda: Response(get_cached_tree('all', all_categories_data), status=status.HTTP_200_OK)
+            )
 
         filters = Q()
         params = request.query_params
@@ -45,9 +160,66 @@ class ProductCategoryAPIView(APIView):
         if 'sales' in params:
             filters &= Q(sales=params['sales'])
 
+        ranked_ids = None
+        if params.get('q'):
+            ranked_ids = search_product_ids(params['q'])
+            if ranked_ids is None:
+                filters &= Q(name__icontains=params['q'])
+            else:
+                filters &= Q(id__in=ranked_ids)
+
+        if 'related' in params:
+            try:
+                ranked_ids = related_product_ids(int(params['related']))
+            except ValueError:
+                ranked_ids = []
+            filters &= Q(id__in=ranked_ids)
+
         products = Product.objects.filter(filters)
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if ranked_ids:
+            products = products.order_by(
+                Case(*[When(id=pk, then=Value(rank)) for rank, pk in enumerate(ranked_ids)])
+            )
+
+        # Category names are part of each row, so a category change must
+        # invalidate product pages as well. Keyset pages validate their own
+        # rows so deep pages stay a range query.
+        if ranked_ids is None and ProductCursorPagination.requested(request):
+            validators = page_validators(
+                request, ProductCursorPagination(), products, 'updated_at', get_tree_version()
+            )
+        else:
+            validators = queryset_validators(request, products, 'updated_at', get_tree_version(), ranked_ids)
+        return conditional_response(
+            request, validators, lambda: self.list_products(request, products, ranked=ranked_ids is not None)
+        )
+
+    def list_products(self, request, products, ranked=False):
+        params = request.query_params
+        products, serializer_class, serializer_kwargs = project_products(products, params)
+
+        if params.get('fast') == 'true':
+            fields = serializer_class(**serializer_kwargs).fields
+            products = product_values(products, list(fields))
+
+            def render(rows):
+                return product_rows(rows, fields)
+        else:
+            def render(rows):
+                return serializer_class(rows, many=True, **serializer_kwargs).data
+
+        # Keyset pages re-sort by their own ordering, which would lose the rank.
+        if ranked and ProductSearchPagination.requested(request):
+            paginator = ProductSearchPagination()
+            page = paginator.paginate_queryset(products, request, view=self)
+            return paginator.get_paginated_response(render(page))
+
+        if not ranked and ProductCursorPagination.requested(request):
+            paginator = ProductCursorPagination()
+            page = paginator.paginate_queryset(products, request, view=self)
+            return paginator.get_paginated_response(render(page))
+
+        return Response(render(products), status=status.HTTP_200_OK)
 
     def post(self, request):
         serializer = ProductSerializer(data=request.data)
@@ -84,23 +256,35 @@ class ProductCategoryAPIView(APIView):
 
 
 class CategoryAPIView(APIView):
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
     def get_permissions(self):
         if self.request.method == 'GET':
             return [AllowAny()]
         return [IsStaffUser()]
 
+    @cache_anonymous_get('categories', 'category')
     def get(self, request):
         cat_id = request.query_params.get('id')
         if cat_id:
             try:
-                category = Category.objects.get(id=cat_id)
-                serializer = CategorySerializer(category)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            except Category.DoesNotExist:
+                cat_id = int(cat_id)
+            except ValueError:
                 return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
-        categories = Category.objects.filter(parent__isnull=True)
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+            return conditional_response(
+                request, tree_validators(request, f'node:{cat_id}'), lambda: self.subtree_response(cat_id)
+            )
+        return conditional_response(
+            request, tree_validators(request, 'roots'),
+            lambda: Response(get_cached_tree('roots', category_roots_data), status=status.HTTP_200_OK)
+        )
+
+    def subtree_response(self, cat_id):
+        try:
+            data = get_cached_tree(f'node:{cat_id}', lambda: category_subtree_data(cat_id))
+        except Category.DoesNotExist:
+            return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
 
     def post(self, request):
         serializer = CategorySerializer(data=request.data)
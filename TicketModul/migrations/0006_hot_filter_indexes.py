@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 07:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TicketModul', '0005_alter_message_file_id_alter_message_file_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'priority'], name='ticket_status_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['related_order_id'], name='ticket_related_order_idx'),
+        ),
+    ]
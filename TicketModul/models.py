@@ -26,6 +26,12 @@ class Ticket(models.Model):
     updated_at = models.DateTimeField()
     resolved_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority'], name='ticket_status_priority_idx'),
+            models.Index(fields=['related_order_id'], name='ticket_related_order_idx'),
+        ]
+
     def __str__(self):
         return f"{self.id} - {self.subject}"
 
@@ -29,5 +29,11 @@ class User(AbstractUser):
     last_login = models.DateTimeField(null=True, blank=True)
     password_last_changed = models.DateTimeField(null=True, blank=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['total_spent'], name='user_total_spent_idx'),
+            models.Index(fields=['last_purchase_date'], name='user_last_purchase_idx'),
+        ]
+
     def __str__(self):
         return self.username